@@ -25,6 +25,15 @@ class Settings(BaseSettings):
     REDIS_DB: int = 1
     REDIS_PASSWORD: SecretStr | None = None
 
+    TESTNET: bool = True
+
+    # Users are spread over WORKER_COUNT containers x WORKER_PROCESSES processes,
+    # both must be the same in every container
+    WORKER_COUNT: int = 1
+    WORKER_INDEX: int = 0
+    WORKER_PROCESSES: int = 0  # 0 - one per CPU core, only with WORKER_COUNT=1
+    WORKER_MAX_STEPS: int = 50
+
 
 
     model_config = SettingsConfigDict(env_file_encoding="utf-8")
@@ -1,2 +1,4 @@
 from . import postgres_db
-from .redis_db import RedisClient
\ No newline at end of file
+from .redis_db import RedisClient
+from .notify import ChangeListener, change_listener
+from .price_cache import PriceCache, price_cache
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Set
+
+from redis.asyncio import Redis
+
+from .redis_db import RedisClient
+
+logger = logging.getLogger('trading')
+
+# value of the change, None when messages may have been missed and state should be re-read
+ChangeCallback = Callable[[Optional[str]], None]
+
+
+class ChangeListener:
+    """
+    One pub/sub connection per process for the changes RedisClient publishes
+    (settings, is_run:{id}). Subscribers get a cheap synchronous callback and
+    re-read state themselves, so a lost message only delays them until their
+    safety-net poll.
+    """
+
+    def __init__(self, redis: Redis, reconnect_delay: float = 1):
+        self.redis = redis
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, Set[ChangeCallback]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, callback: ChangeCallback):
+        self._subscribers[topic].add(callback)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, topic: str, callback: ChangeCallback):
+        callbacks = self._subscribers.get(topic)
+        if callbacks:
+            callbacks.discard(callback)
+            if not callbacks:
+                del self._subscribers[topic]
+
+    def _notify(self, topic: str, value: Optional[str]):
+        for callback in list(self._subscribers.get(topic, ())):
+            try:
+                callback(value)
+            except Exception as e:
+                logger.exception(f'Change callback for {topic} failed {e}')
+
+    def _notify_all(self):
+        for topic in list(self._subscribers):
+            self._notify(topic, None)
+
+    async def _run(self):
+        first = True
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(RedisClient.CHANGES_CHANNEL)
+                if not first:
+                    # Anything published while disconnected is gone
+                    self._notify_all()
+                first = False
+                async for message in pubsub.listen():
+                    topic, _, value = message['data'].partition('=')
+                    self._notify(topic, value or None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Change listener disconnected {e}')
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+_listeners: Dict[int, ChangeListener] = {}
+
+
+def change_listener(redis: Redis) -> ChangeListener:
+    """The process-wide listener for this Redis connection pool."""
+    listener = _listeners.get(id(redis))
+    if listener is None:
+        listener = _listeners[id(redis)] = ChangeListener(redis)
+    return listener
@@ -0,0 +1,55 @@
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+class PriceCache:
+    """
+    Mark prices kept in the process, each with the time the parser published it
+    (wall clock, the parser may run on another host). Filled by the parser when
+    it runs in the same process and by Redis reads, read synchronously by anyone
+    who can live with `max_age` old prices.
+    """
+
+    def __init__(self, max_age: float = 1.0):
+        self.max_age = max_age
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def push(self, prices: Mapping[str, float], published_at: Optional[float] = None):
+        published_at = time.time() if published_at is None else published_at
+        for symbol, price in prices.items():
+            try:
+                self._prices[symbol] = (float(price), published_at)
+            except (TypeError, ValueError):
+                continue
+
+    def get(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        entry = self._prices.get(symbol)
+        max_age = self.max_age if max_age is None else max_age
+        if entry is None or time.time() - entry[1] > max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def get_many(self, symbols: Iterable[str], max_age: Optional[float] = None) -> Tuple[Dict[str, float], List[str]]:
+        """Fresh prices and the symbols that have to be read elsewhere."""
+        fresh, missing = {}, []
+        for symbol in symbols:
+            price = self.get(symbol, max_age)
+            if price is None:
+                missing.append(symbol)
+            else:
+                fresh[symbol] = price
+        return fresh, missing
+
+    def discard(self, symbols: Iterable[str]):
+        for symbol in symbols:
+            self._prices.pop(symbol, None)
+
+    def clear(self):
+        self._prices.clear()
+
+
+price_cache = PriceCache()
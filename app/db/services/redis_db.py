@@ -1,10 +1,13 @@
 import json
+import time
 from redis.asyncio import Redis
-from typing import Union,Optional,Dict, Hashable
+from typing import Union,Optional,Dict, Hashable, List
 import logging
 
 
 from app.db.models import Run,CoinSettings,TradeSettings
+from .redis_writer import HashDeltaWriter
+from .price_cache import price_cache
 
 
 
@@ -13,9 +16,19 @@ from app.db.models import Run,CoinSettings,TradeSettings
 class RedisClient:
     def __init__(self, redis: Redis):
         self.redis = redis
+        # Parser side: only changed fields are sent to Redis
+        self.coins_writer = HashDeltaWriter(redis, self.COINS_KEY)
+        self.prices_writer = HashDeltaWriter(redis, self.PRICES)
+        # Process-wide, shared by every RedisClient
+        self.price_cache = price_cache
 
     GLOBAL_TRADE_SETTINGS_KEY = "global_trade_settings"
 
+    # Change notifications, see notify.ChangeListener. Message: "<topic>" or "<topic>=<value>"
+    CHANGES_CHANNEL = "changes"
+    SETTINGS_TOPIC = "settings"
+    COINS_INFO_TOPIC = "coins_info"
+
     DEFAULTS_TRADE = TradeSettings()
 
 
@@ -64,7 +77,10 @@ class RedisClient:
         return value
     async def set(self, field: str, value: Union[str,float]):
         key=self.get_key(field)
-        await self.redis.hset(key, field, value)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, field, value)
+            pipe.publish(self.CHANGES_CHANNEL, self.SETTINGS_TOPIC)
+            await pipe.execute()
 
 
     COINS_KEY = "coins"
@@ -74,16 +90,13 @@ class RedisClient:
         return {k: json.loads(v) for k, v in res.items()}
 
     async def save_coins(self, data: dict):
-        existing_keys = set(await self.redis.hkeys(self.COINS_KEY))
-
-        new_keys = set(data.keys())
-
-        keys_to_delete = existing_keys - new_keys
-        if keys_to_delete:
-            await self.redis.hdel(self.COINS_KEY, *keys_to_delete)
-
         json_data = {k: json.dumps(v) for k, v in data.items()}
-        await self.redis.hset(self.COINS_KEY, mapping=json_data)
+        await self.coins_writer.write(json_data, replace=True)
+
+    async def update_coins(self, updated: dict, removed):
+        """Write only the coins whose signal changed."""
+        json_data = {k: json.dumps(v) for k, v in updated.items()}
+        await self.coins_writer.apply(json_data, removed)
 
     COIN_INFO_KEY = "coins_info"
 
@@ -97,37 +110,131 @@ class RedisClient:
 
     async def save_coins_info(self, data: dict):
         json_data = {k: json.dumps(v) for k, v in data.items()}
-        await self.redis.hset(self.COIN_INFO_KEY, mapping=json_data)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.COIN_INFO_KEY, mapping=json_data)
+            pipe.publish(self.CHANGES_CHANNEL, self.COINS_INFO_TOPIC)
+            await pipe.execute()
 
 
     IS_RUN_KEY='is_run'
+    # user_id -> Run for every user, replaces the is_run:{id} keys
+    RUN_STATE_KEY='run_state'
+    # Run state changes for workers, see app/worker/broker.py
+    COMMANDS_STREAM='trade_commands'
+    COMMANDS_MAXLEN=10_000
 
     async def get_is_run(self, user_id: int) -> Run:
-        data = await self.redis.get(f'{self.IS_RUN_KEY}:{user_id}')
-        return Run(json.loads(data)) if data else Run.OFF
+        data = await self.redis.hget(self.RUN_STATE_KEY, str(user_id))
+        if data is None:
+            # not migrated yet
+            legacy = await self.redis.get(f'{self.IS_RUN_KEY}:{user_id}')
+            return Run(json.loads(legacy)) if legacy else Run.OFF
+        return Run(data)
 
     async def set_is_run(self, user_id: int, flag:Run):
-        await self.redis.set(f'{self.IS_RUN_KEY}:{user_id}', json.dumps(flag))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.RUN_STATE_KEY, str(user_id), Run(flag).value)
+            pipe.delete(f'{self.IS_RUN_KEY}:{user_id}')
+            pipe.xadd(self.COMMANDS_STREAM, {'user_id': user_id, 'state': Run(flag).value},
+                      maxlen=self.COMMANDS_MAXLEN, approximate=True)
+            pipe.publish(self.CHANGES_CHANNEL, f'{self.IS_RUN_KEY}:{user_id}={Run(flag).value}')
+            await pipe.execute()
 
     async def get_all_is_run(self) -> Dict[int, Run]:
-        keys = await self.redis.keys(f'{self.IS_RUN_KEY}:*')
+        """Every user's state in one HGETALL."""
         result = {}
-        for key in keys:
+        for user_id, state in (await self.redis.hgetall(self.RUN_STATE_KEY)).items():
             try:
-                user_id = int(key.split(':')[1])
-                result[user_id] = await self.get_is_run(user_id)
-            except (IndexError, ValueError):
+                result[int(user_id)] = Run(state)
+            except ValueError:
                 continue
         return result
 
+    async def _scan_legacy_is_run(self, batch: int = 500) -> Dict[str, Run]:
+        """is_run:{id} keys via SCAN + MGET, never KEYS."""
+        result = {}
+        keys = []
+        async for key in self.redis.scan_iter(match=f'{self.IS_RUN_KEY}:*', count=batch):
+            keys.append(key)
+        for i in range(0, len(keys), batch):
+            chunk = keys[i:i + batch]
+            for key, value in zip(chunk, await self.redis.mget(chunk)):
+                try:
+                    result[key] = Run(json.loads(value))
+                except (TypeError, ValueError):
+                    continue
+        return result
+
+    async def migrate_is_run(self) -> int:
+        """
+        Moves is_run:{id} keys into the run_state hash. A state already in the
+        hash is newer and is kept. Safe to run on every start.
+        """
+        legacy = await self._scan_legacy_is_run()
+        if not legacy:
+            return 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, state in legacy.items():
+                try:
+                    user_id = int(key.split(':')[1])
+                except (IndexError, ValueError):
+                    continue
+                pipe.hsetnx(self.RUN_STATE_KEY, str(user_id), state.value)
+            pipe.delete(*legacy.keys())
+            await pipe.execute()
+        logging.info(f'Migrated {len(legacy)} is_run keys to {self.RUN_STATE_KEY}')
+        return len(legacy)
 
-    PRICES='prices'
 
-    async def save_mark_price_coins(self,data: Dict) -> None:
-        await self.redis.hset(self.PRICES,mapping=data)
+    PRICES='prices'
+    # When the parser last wrote the prices hash, unchanged prices are as old as this
+    PRICES_AT='prices_at'
+
+    async def save_mark_price_coins(self,data: Dict, published_at: Optional[float] = None) -> None:
+        """
+        Changed prices only. Called on every parser cycle, so prices_at moves while
+        the source is alive. published_at - when the prices were taken, default now.
+        """
+        published_at = time.time() if published_at is None else published_at
+        # Readers in this process get the prices without a round trip
+        self.price_cache.push(data, published_at)
+        if data:
+            await self.prices_writer.write({k: str(v) for k, v in data.items()}, replace=False)
+        await self.redis.set(self.PRICES_AT, published_at)
+
+
+    async def get_mark_prices(self, symbols: List[str], max_age: Optional[float] = None) -> Dict[str, float]:
+        """
+        Prices of several coins: fresh ones from the in-process cache, the rest in one HMGET.
+        Unknown coins are left out.
+        """
+        result, missing = self.price_cache.get_many(symbols, max_age)
+        if not missing:
+            return result
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(self.PRICES, missing)
+            pipe.get(self.PRICES_AT)
+            values, published_at = await pipe.execute()
+        fetched = {}
+        for symbol, value in zip(missing, values):
+            try:
+                fetched[symbol] = float(value)
+            except (TypeError, ValueError):
+                continue
+        try:
+            published_at = float(published_at)
+        except (TypeError, ValueError):
+            published_at = 0.0  # unknown age, returned but not reused
+        # Cached as old as the parser wrote them: a stopped parser does not look fresh
+        self.price_cache.push(fetched, published_at)
+        result.update(fetched)
+        return result
 
 
     async def get_mark_price_coin(self,symbol: Hashable) -> float:
+        cached=self.price_cache.get(symbol)
+        if cached is not None:
+            return cached
         value=await self.redis.hget(self.PRICES,symbol)
         try:
             value = float(value)
@@ -0,0 +1,139 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from redis.asyncio import Redis
+
+
+
+logger = logging.getLogger('admin')
+
+
+@dataclass
+class WriteStats:
+    cycles: int = 0
+    reconciles: int = 0
+    fields_sent: int = 0
+    fields_saved: int = 0
+    bytes_sent: int = 0
+    bytes_saved: int = 0
+    commands_sent: int = 0
+    commands_saved: int = 0
+    # Same numbers for the latest cycle only
+    last_bytes_saved: int = 0
+    last_commands_saved: int = 0
+
+
+def _size(mapping: Dict[str, str]) -> int:
+    return sum(len(k) + len(v) for k, v in mapping.items())
+
+
+class HashDeltaWriter:
+    """
+    Writes a Redis hash remembering what was written last time, so each cycle
+    only sends the fields that changed (HSET) or disappeared (HDEL) in one
+    MULTI. Every `reconcile_interval` seconds (and on the first write) the
+    whole hash is rewritten to fix drift from other writers or restarts.
+
+    The rewrite never leaves the hash partial: once a full write (replace=True)
+    told the writer every field, the new hash is built under a temporary key
+    and renamed into place; before that, known fields are only upserted.
+    """
+
+    def __init__(self, redis: Redis, key: str, reconcile_interval: Optional[float] = 300):
+        self.redis = redis
+        self.key = key
+        self.reconcile_interval = reconcile_interval
+        self.last: Dict[str, str] = {}
+        # True once `last` holds every field of the hash, not just upserted ones
+        self.complete = False
+        self.stats = WriteStats()
+        self._reconciled_at: Optional[float] = None
+
+    def _reconcile_due(self) -> bool:
+        if self._reconciled_at is None:
+            return True
+        if not self.reconcile_interval:
+            return False
+        return time.monotonic() - self._reconciled_at >= self.reconcile_interval
+
+    async def write(self, data: Dict[str, str], replace: bool = True):
+        """
+        Make the hash equal to `data` (or only upsert it when replace=False).
+        """
+        removed = [k for k in self.last if k not in data] if replace else []
+        if replace:
+            self.complete = True
+        await self.apply(data, removed, replace)
+
+    async def apply(self, updated: Dict[str, str], removed: Iterable[str] = (), replace: bool = False):
+        changed = {k: v for k, v in updated.items() if self.last.get(k) != v}
+        removed = [k for k in removed if k in self.last]
+
+        # What a naive writer would send: every field, HDEL of removed ones and,
+        # to find them on a full write, an HKEYS round trip returning every field name
+        naive_bytes = _size(updated) + sum(map(len, removed))
+        naive_commands = 1 + int(bool(removed))
+        if replace:
+            naive_bytes += sum(map(len, self.last))
+            naive_commands += 1
+
+        self.last.update(changed)
+        for k in removed:
+            self.last.pop(k, None)
+
+        try:
+            if self._reconcile_due():
+                sent_commands = await self._reconcile()
+                sent_bytes = _size(self.last)
+            else:
+                sent_bytes = _size(changed) + sum(map(len, removed))
+                sent_commands = int(bool(changed)) + int(bool(removed))
+                if sent_commands:
+                    async with self.redis.pipeline(transaction=True) as pipe:
+                        if removed:
+                            pipe.hdel(self.key, *removed)
+                        if changed:
+                            pipe.hset(self.key, mapping=changed)
+                        await pipe.execute()
+        except Exception:
+            # Redis state is unknown now, rewrite everything next time
+            self._reconciled_at = None
+            raise
+
+        stats = self.stats
+        stats.cycles += 1
+        stats.fields_sent += len(changed) + len(removed)
+        stats.fields_saved += len(updated) - len(changed)
+        stats.bytes_sent += sent_bytes
+        stats.commands_sent += sent_commands
+        stats.last_bytes_saved = max(naive_bytes - sent_bytes, 0)
+        stats.last_commands_saved = max(naive_commands - sent_commands, 0)
+        stats.bytes_saved += stats.last_bytes_saved
+        stats.commands_saved += stats.last_commands_saved
+
+    async def _reconcile(self) -> int:
+        """Rewrite the hash from `last`, returns the number of commands sent."""
+        commands = 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if not self.complete:
+                # Other fields may be valid, only ours are known
+                if self.last:
+                    pipe.hset(self.key, mapping=self.last)
+                    commands = 1
+            elif self.last:
+                tmp = f'{self.key}:rewrite'
+                pipe.delete(tmp)
+                pipe.hset(tmp, mapping=self.last)
+                pipe.rename(tmp, self.key)
+                commands = 3
+            else:
+                pipe.delete(self.key)
+                commands = 1
+            if commands:
+                await pipe.execute()
+        self._reconciled_at = time.monotonic()
+        self.stats.reconciles += 1
+        logger.debug(f'Full rewrite of {self.key}: {len(self.last)} fields')
+        return commands
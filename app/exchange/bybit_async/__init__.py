@@ -1,5 +1,7 @@
 from .bybit_async import BybitRequester
 from .exceptions import BybitApiError
+from .sessions import SessionRegistry, sessions, close_sessions
+from .rate_limit import RateLimiter, rate_limiter
 from .stock_bot import (
     get_order,
     get_balance,
@@ -12,12 +14,19 @@ from .stock_bot import (
     get_all_position,
     close_order,
     get_pnl_from_chunks,
-    get_api_permissions
+    get_api_permissions,
+    place_batch_orders,
+    close_batch_orders
 )
 
 __all__ = [
     'BybitRequester',
     'BybitApiError',
+    'SessionRegistry',
+    'sessions',
+    'close_sessions',
+    'RateLimiter',
+    'rate_limiter',
     'get_order',
     'get_balance',
     'get_positions',
@@ -29,5 +38,7 @@ __all__ = [
     'get_all_position',
     'close_order',
     'get_pnl_from_chunks',
-    'get_api_permissions'
+    'get_api_permissions',
+    'place_batch_orders',
+    'close_batch_orders'
 ]
\ No newline at end of file
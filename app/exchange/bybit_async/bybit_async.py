@@ -1,57 +1,100 @@
 import logging
-import json
 import aiohttp
 import time
 import hmac
 import hashlib
 import asyncio
+from typing import Dict, Optional
+from app.exchange.codec import loads, dumps
+
+from .coalesce import single_flight, read_cache
+from .rate_limit import rate_limiter
+from .sessions import sessions
 from .utils import retrier_async, validate_response
 
 logger = logging.getLogger('trading')
 
+RATE_LIMIT_RET_CODE = 10006
+
 def dict_to_query_string(params: dict) -> str:
     return '&'.join([f'{key}={value}' for key, value in params.items()])
 
 class BybitRequester:
-    def __init__(self, api_key: str, api_secret: str, testnet: bool, session: aiohttp.ClientSession = None):
+    def __init__(self, api_key: str, api_secret: str, testnet: bool, session: aiohttp.ClientSession = None,
+                 read_cache_ttl: Optional[Dict[str, float]] = None):
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
         self.recv_window = '5000'
         self.base_url = "https://api.bybit.com"
         self.base_url_testnet = 'https://api-testnet.bybit.com'
+        # Own session only when one is passed, otherwise the process-wide one is borrowed
         self._session = session
         self._session_lock = asyncio.Lock()
+        self.rate_limiter = rate_limiter
+        # endpoint -> seconds a GET result may be reused, e.g. {'/v5/position/list': 0.5}
+        self.read_cache_ttl = read_cache_ttl or {}
 
     def _get_base_url(self) -> str:
         return self.base_url_testnet if self.testnet else self.base_url
 
-    async def _ensure_session(self):
-        """Ensure that the session is open and create a new one if needed."""
-        async with self._session_lock:
-            if self._session is None or self._session.closed:
-                logger.info("Creating new aiohttp ClientSession")
-                self._session = aiohttp.ClientSession()
-
     @property
-    async def session(self):
-        await self._ensure_session()
-        return self._session
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is not None and not self._session.closed:
+            return self._session
+        return await sessions.get(self._get_base_url())
 
     async def close(self):
+        """Close an explicitly passed session, the shared one lives until close_sessions()."""
         async with self._session_lock:
             if self._session and not self._session.closed:
-                await self._session.closed
-                self._session = None
+                await self._session.close()
+            self._session = None
 
-    @retrier_async
     async def send_public_request(self, endpoint: str, params: dict = None) -> dict:
+        query = dict_to_query_string(params or {})
+        key = (self._get_base_url(), endpoint, query)
+        return await self._coalesced_read(None, key, endpoint, lambda: self._send_public_request(endpoint, params))
+
+    async def send_signed_request(self, method: str, endpoint: str, params: dict, **kwargs) -> dict:
+        if method.upper() != "GET":
+            # Any write can change what the account reads
+            read_cache.invalidate(self.api_key)
+            return await self._send_signed_request(method, endpoint, params, **kwargs)
+
+        key = (self._get_base_url(), self.api_key, endpoint, dict_to_query_string(params))
+        return await self._coalesced_read(
+            self.api_key, key, endpoint,
+            lambda: self._send_signed_request(method, endpoint, params, **kwargs)
+        )
+
+    async def _coalesced_read(self, owner: Optional[str], key: tuple, endpoint: str, request) -> dict:
+        """
+        Identical concurrent GETs share one request, results are optionally reused for a short TTL.
+        Callers get the same response object and must not mutate it.
+        A write of the owner during the request keeps its result out of the cache,
+        and reads started after the write do not join it.
+        """
+        ttl = self.read_cache_ttl.get(endpoint)
+        if ttl:
+            cached = read_cache.get(owner, key, ttl)
+            if not read_cache.is_miss(cached):
+                return cached
+
+        generation = read_cache.generation(owner)
+        data = await single_flight.do((*key, generation), request)
+        if ttl:
+            read_cache.put(owner, key, data, generation)
+        return data
+
+    @retrier_async
+    async def _send_public_request(self, endpoint: str, params: dict = None) -> dict:
         session = await self.session
         url = f"{self._get_base_url()}{endpoint}"
         try:
             async with session.get(url, params=params) as response:
                 response.raise_for_status()
-                data = await response.json()
+                data = loads(await response.read())
                 validate_response(data, endpoint, params)
                 return data
         except aiohttp.ClientConnectionError as e:
@@ -60,10 +103,18 @@ class BybitRequester:
             raise  # Let the retrier handle this
 
     @retrier_async
-    async def send_signed_request(self, method: str, endpoint: str, params: dict) -> dict:
+    async def _send_signed_request(self, method: str, endpoint: str, params: dict) -> dict:
         session = await self.session
+        # Wait for the UID/endpoint budget before signing, so recv_window is not eaten by the queue
+        await self.rate_limiter.acquire(self.api_key, endpoint)
         time_stamp = str(int(time.time() * 1000))
-        signature = self._gen_signature(params, time_stamp, method)
+        if method.upper() == "POST":
+            param_str = dumps(params)
+        elif method.upper() == "GET":
+            param_str = dict_to_query_string(params)
+        else:
+            raise ValueError(f"Unsupported method: {method}")
+        signature = self._gen_signature(param_str, time_stamp)
         headers = {
             'X-BAPI-API-KEY': self.api_key,
             'X-BAPI-SIGN': signature,
@@ -77,18 +128,19 @@ class BybitRequester:
 
         try:
             if method.upper() == "POST":
-                async with session.post(url, headers=headers, data=json.dumps(params)) as response:
+                async with session.post(url, headers=headers, data=param_str) as response:
+                    self.rate_limiter.update(self.api_key, endpoint, response.headers)
                     response.raise_for_status()
-                    data = await response.json()
-            elif method.upper() == "GET":
-                query = dict_to_query_string(params)
-                full_url = f"{url}?{query}"
+                    data = loads(await response.read())
+            else:
+                full_url = f"{url}?{param_str}"
                 async with session.get(full_url, headers=headers) as response:
+                    self.rate_limiter.update(self.api_key, endpoint, response.headers)
                     response.raise_for_status()
-                    data = await response.json()
-            else:
-                raise ValueError(f"Unsupported method: {method}")
+                    data = loads(await response.read())
 
+            if data.get('retCode') == RATE_LIMIT_RET_CODE:
+                self.rate_limiter.block(self.api_key, endpoint)
             validate_response(data, endpoint, params)
             return data
         except (aiohttp.ClientConnectionError, aiohttp.ClientOSError) as e:
@@ -97,15 +149,15 @@ class BybitRequester:
             raise  # Let the retrier handle this
 
     async def _handle_connection_error(self):
-        """Handle connection errors by creating a new session."""
-        logger.info("Handling connection error, recreating session")
+        """Drop an own broken session, the shared connector discards bad connections itself."""
         async with self._session_lock:
             if self._session and not self._session.closed:
+                logger.info("Handling connection error, closing own session")
                 try:
                     await self._session.close()
                 except Exception as e:
                     logger.warning(f"Error closing session: {e}")
-            self._session = None  # Will be recreated on next request
+            self._session = None
 
     async def send_paginated_request(self, method: str, endpoint: str, params: dict = None):
         params = params or {}
@@ -128,11 +180,6 @@ class BybitRequester:
             if not next_cursor or next_cursor == last_cursor:
                 return result
 
-    def _gen_signature(self, params: dict, time_stamp: str, method: str) -> str:
-        if method.upper() == "POST":
-            param_str = json.dumps(params)
-        else:
-            param_str = dict_to_query_string(params)
-
+    def _gen_signature(self, param_str: str, time_stamp: str) -> str:
         base_str = f"{time_stamp}{self.api_key}{self.recv_window}{param_str}"
         return hmac.new(self.api_secret.encode(), base_str.encode(), hashlib.sha256).hexdigest()
\ No newline at end of file
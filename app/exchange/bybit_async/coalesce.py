@@ -0,0 +1,87 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight request.
+    A caller being cancelled does not cancel the request for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved when every caller went away
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class ReadCache:
+    """
+    Short-lived results of read endpoints, grouped by api key so that any
+    write of an account drops its cached reads.
+
+    Every invalidate bumps the owner's generation: a read started before a
+    write passes the generation it saw to put() and is not stored.
+    """
+    _MISS = object()
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._data: Dict[Optional[str], OrderedDict] = {}
+        self._generations: Dict[Optional[str], int] = {}
+        self.hits = 0
+        self.stale_puts = 0
+
+    def generation(self, owner: Optional[str]) -> int:
+        return self._generations.get(owner, 0)
+
+    def get(self, owner: Optional[str], key: Hashable, max_age: float) -> Any:
+        entries = self._data.get(owner)
+        if not entries or key not in entries:
+            return self._MISS
+        stored_at, value = entries[key]
+        if time.monotonic() - stored_at > max_age:
+            del entries[key]
+            return self._MISS
+        self.hits += 1
+        return value
+
+    def put(self, owner: Optional[str], key: Hashable, value: Any, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation(owner):
+            self.stale_puts += 1
+            return
+        entries = self._data.setdefault(owner, OrderedDict())
+        entries[key] = (time.monotonic(), value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def invalidate(self, owner: Optional[str]):
+        self._data.pop(owner, None)
+        self._generations[owner] = self.generation(owner) + 1
+
+    @classmethod
+    def is_miss(cls, value: Any) -> bool:
+        return value is cls._MISS
+
+
+single_flight = SingleFlight()
+read_cache = ReadCache()
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger('trading')
+
+
+# Bybit v5 per-UID limits, requests per second
+ENDPOINT_LIMITS: Dict[str, float] = {
+    '/v5/order/create': 10,
+    '/v5/order/amend': 10,
+    '/v5/order/cancel': 10,
+    '/v5/order/create-batch': 10,
+    '/v5/order/realtime': 50,
+    '/v5/order/history': 50,
+    '/v5/position/list': 50,
+    '/v5/position/closed-pnl': 50,
+    '/v5/position/set-leverage': 10,
+    '/v5/position/switch-mode': 10,
+    '/v5/account/wallet-balance': 50,
+    '/v5/user/query-api': 10,
+}
+DEFAULT_LIMIT = 10
+
+
+class TokenBucket:
+    """
+    Requests per second for one (api_key, endpoint). Refills continuously and
+    follows the limit / remaining / reset values Bybit reports in headers.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Take a token, waiting if needed. Returns the time waited."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def update(self, limit: Optional[int], remaining: Optional[int], reset_ms: Optional[int]):
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.rate = self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset_ms:
+                self.blocked_until = max(self.blocked_until, now + max(reset_ms / 1000 - time.time(), 0))
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    def __init__(self, limits: Optional[Dict[str, float]] = None, default: float = DEFAULT_LIMIT):
+        self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+        self.default = default
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self.waited = 0.0
+
+    def _bucket(self, api_key: str, endpoint: str) -> TokenBucket:
+        key = (api_key, endpoint)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.limits.get(endpoint, self.default))
+        return bucket
+
+    async def acquire(self, api_key: str, endpoint: str):
+        waited = await self._bucket(api_key, endpoint).acquire()
+        if waited:
+            self.waited += waited
+            logger.debug(f'Rate limit {endpoint}: waited {waited:.2f}s')
+
+    def update(self, api_key: str, endpoint: str, headers: Mapping[str, str]):
+        remaining = _int_header(headers, 'X-Bapi-Limit-Status')
+        if remaining is None:
+            return
+        self._bucket(api_key, endpoint).update(
+            _int_header(headers, 'X-Bapi-Limit'),
+            remaining,
+            _int_header(headers, 'X-Bapi-Limit-Reset-Timestamp'),
+        )
+
+    def available(self, api_key: str, endpoint: str) -> int:
+        """Requests that can go out right now without waiting."""
+        bucket = self._bucket(api_key, endpoint)
+        now = time.monotonic()
+        if now < bucket.blocked_until:
+            return 0
+        bucket._refill(now)
+        return int(bucket.tokens)
+
+    def block(self, api_key: str, endpoint: str, seconds: float = 1):
+        """Back off after a rate limit error without headers."""
+        bucket = self._bucket(api_key, endpoint)
+        bucket.tokens = 0
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Dict
+
+import aiohttp
+
+logger = logging.getLogger('trading')
+
+
+class SessionRegistry:
+    """
+    One aiohttp ClientSession per base URL for the whole process.
+
+    Every BybitRequester borrows its session from here, so hundreds of users
+    share a single keep-alive TCP/TLS pool per host instead of one each.
+    """
+
+    def __init__(
+            self,
+            limit: int = 200,
+            limit_per_host: int = 100,
+            keepalive_timeout: float = 30,
+            dns_cache_ttl: int = 300,
+            timeout: float = 15,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._lock = asyncio.Lock()
+
+    def _create(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            enable_cleanup_closed=True,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def get(self, base_url: str) -> aiohttp.ClientSession:
+        session = self._sessions.get(base_url)
+        if session is not None and not session.closed:
+            return session
+
+        async with self._lock:
+            session = self._sessions.get(base_url)
+            if session is None or session.closed:
+                logger.info(f"Creating shared aiohttp ClientSession for {base_url}")
+                session = self._sessions[base_url] = self._create()
+            return session
+
+    async def close(self):
+        async with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for base_url, session in sessions.items():
+            try:
+                if not session.closed:
+                    await session.close()
+            except Exception as e:
+                logger.warning(f"Error closing session {base_url}: {e}")
+
+
+sessions = SessionRegistry()
+
+
+async def close_sessions():
+    await sessions.close()
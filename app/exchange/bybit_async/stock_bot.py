@@ -11,6 +11,37 @@ logger=logging.getLogger('trading')
 
 #TODO: ПЕРЕСМОТРЕТЬ КАКИЕ ДАННЫЕ ВОЗВРАЩАЮТСЯ ЕСЛИ БОЛЬШАЯ ОШИБКА
 
+BATCH_ORDER_LIMIT = 10  # linear orders per /v5/order/create-batch request
+
+
+def order_params(coin: Hashable, amount: float, buy: bool, tp_price: float = 0, sl_price: float = 0) -> Dict:
+    return {
+        'category': 'linear',
+        'symbol': coin,
+        'orderType': 'Market',
+        'side': 'Buy' if buy else "Sell",
+        'qty': str(amount),
+        'takeProfit': str(tp_price) if tp_price else None,
+        'stopLoss': str(sl_price) if sl_price else None,
+        "timeInForce":"GTC",
+        "positionIdx": 1 if buy else 2
+    }
+
+
+def close_order_params(position: Dict) -> Dict:
+    side='Buy' if position['side']=='Sell' else 'Sell'
+    return {
+        'category': 'linear',
+        'symbol':position['symbol'],
+        'side': side,
+        'orderType':'Market',
+        'qty': position['size'],
+        'marketUnit': 'baseCoin',
+        'positionIdx': position['positionIdx'],
+        'reduceOnly': True
+    }
+
+
 async def place_order(
         bybit_requester: BybitRequester,
         coin:Hashable,
@@ -28,19 +59,7 @@ async def place_order(
     if tp_price <= 0 and sl_price<=0:
         raise ValueError("The 'tp_price' parameter must be greater than 0.")
 
-    order_data = {
-            'category': 'linear',
-            'symbol': coin,
-            'orderType': 'Market',
-            'side': 'Buy' if buy else "Sell",
-            'qty': str(amount),
-            'takeProfit': str(tp_price) if tp_price else None,
-            'stopLoss': str(sl_price) if sl_price else None,
-            "timeInForce":"GTC",
-            "positionIdx": 1 if buy else 2
-
-
-    }
+    order_data = order_params(coin, amount, buy, tp_price, sl_price)
     response={}
     try:
         response = (await bybit_requester.send_signed_request(
@@ -62,7 +81,8 @@ async def place_order(
 async def set_leverage(bybit_requester: BybitRequester,
                        coin: Union[Hashable,str],
                        leverage: float
-                       ):
+                       ) -> Optional[bool]:
+    """True when the coin has `leverage` now, validate_response lets "not modified" (110043) through."""
 
     data = {
         'category': 'linear',
@@ -72,16 +92,18 @@ async def set_leverage(bybit_requester: BybitRequester,
     }
 
     try:
-        response = await bybit_requester.send_signed_request(
+        await bybit_requester.send_signed_request(
             method='POST',
             endpoint='/v5/position/set-leverage',
             params=data
         )
-    except BybitApiError as e:
-        pass
-        #logger.debug(f'{coin} failed set leverage {e}')
+    except BybitApiError:
+        return
     except Exception as e:
         logger.exception(e)
+        return
+
+    return True
 
 
 
@@ -262,18 +284,7 @@ async def get_all_position(bybit_requester:BybitRequester) -> List[Dict]:
 
 
 async def close_order(bybit_requester:BybitRequester, position:Dict) -> Dict:
-    side='Buy' if position['side']=='Sell' else 'Sell'
-
-    data = {
-        'category': 'linear',
-        'symbol':position['symbol'],
-        'side': side,
-        'orderType':'Market',
-        'qty': position['size'],
-        'marketUnit': 'baseCoin',
-        'positionIdx': position['positionIdx'],
-        'reduceOnly': True
-    }
+    data = close_order_params(position)
 
     response={}
     try:
@@ -294,6 +305,57 @@ async def close_order(bybit_requester:BybitRequester, position:Dict) -> Dict:
 
 
 
+async def _send_order_batch(bybit_requester: BybitRequester, orders: List[Dict]) -> List[Dict]:
+    data = {
+        'category': 'linear',
+        'request': [{k: v for k, v in order.items() if k != 'category' and v is not None} for order in orders]
+    }
+
+    try:
+        response = await bybit_requester.send_signed_request(
+            method='POST',
+            endpoint='/v5/order/create-batch',
+            params=data
+        )
+    except BybitApiError as e:
+        logger.error(f'Error in batch order\nData: {data}\nError: {e}')
+        return [{'symbol': order['symbol'], 'retCode': e.ret_code, 'retMsg': e.ret_msg} for order in orders]
+    except Exception as e:
+        logger.exception(e)
+        return [{'symbol': order['symbol'], 'retCode': -1, 'retMsg': str(e)} for order in orders]
+
+    created = response.get('result', {}).get('list', [])
+    statuses = response.get('retExtInfo', {}).get('list', [])
+    results = []
+    for i, order in enumerate(orders):
+        result = {'symbol': order['symbol']}
+        result.update(created[i] if i < len(created) else {})
+        status = statuses[i] if i < len(statuses) else {}
+        result['retCode'] = status.get('code', -1)
+        result['retMsg'] = status.get('msg', 'No result for order')
+        results.append(result)
+    return results
+
+
+async def place_batch_orders(bybit_requester: BybitRequester, orders: List[Dict]) -> List[Dict]:
+    """
+    Send orders (see order_params) through /v5/order/create-batch, BATCH_ORDER_LIMIT per request.
+    Batches run concurrently, the requester rate limiter spaces them out.
+    Returns one result per order in the same order, retCode 0 means placed.
+    """
+    batches = [orders[i:i + BATCH_ORDER_LIMIT] for i in range(0, len(orders), BATCH_ORDER_LIMIT)]
+    results = await asyncio.gather(*(_send_order_batch(bybit_requester, batch) for batch in batches))
+    return [result for batch in results for result in batch]
+
+
+async def close_batch_orders(bybit_requester: BybitRequester, positions: List[Dict]) -> List[Dict]:
+    """Close every open position with reduce-only market orders in batches."""
+    orders = [close_order_params(position) for position in positions
+              if position and float(position.get('size') or 0) > 0]
+    return await place_batch_orders(bybit_requester, orders)
+
+
+
 async def get_pnl_from_chunks(bybit_requester: BybitRequester, chunk:Dict[str,datetime]) -> List[Dict[str,str]]:
     await asyncio.sleep(random.random())
     data = {
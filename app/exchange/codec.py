@@ -0,0 +1,101 @@
+"""
+JSON codec shared by the websocket and REST clients.
+
+Uses orjson or msgspec when installed and falls back to the stdlib json.
+All backends produce compact output, so a payload signed with `dumps`
+is byte-for-byte what is sent.
+"""
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+logger = logging.getLogger('trading')
+
+
+class Codec:
+    def __init__(self, name: str, loads: Callable[[Union[str, bytes]], Any], dumps: Callable[[Any], str]):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return f"Codec({self.name})"
+
+
+def _stdlib_codec() -> Codec:
+    return Codec('json', json.loads, lambda obj: json.dumps(obj, separators=(',', ':')))
+
+
+def _orjson_codec() -> Optional[Codec]:
+    if orjson is None:
+        return None
+    return Codec('orjson', orjson.loads, lambda obj: orjson.dumps(obj).decode())
+
+
+def _msgspec_codec() -> Optional[Codec]:
+    if msgspec is None:
+        return None
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+    return Codec('msgspec', decoder.decode, lambda obj: encoder.encode(obj).decode())
+
+
+_FACTORIES: Dict[str, Callable[[], Optional[Codec]]] = {
+    'orjson': _orjson_codec,
+    'msgspec': _msgspec_codec,
+    'json': _stdlib_codec,
+}
+
+
+def available_codecs() -> Dict[str, Codec]:
+    result = {}
+    for name, factory in _FACTORIES.items():
+        codec = factory()
+        if codec is not None:
+            result[name] = codec
+    return result
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """
+    Codec by name, or the fastest installed one when name is None.
+    """
+    if name is not None:
+        codec = _FACTORIES[name]()
+        if codec is None:
+            raise ImportError(f"JSON backend '{name}' is not installed")
+        return codec
+    return next(iter(available_codecs().values()))
+
+
+_codec = get_codec()
+
+
+def set_codec(name: Optional[str] = None) -> Codec:
+    global _codec
+    _codec = get_codec(name)
+    logger.info(f"JSON codec: {_codec.name}")
+    return _codec
+
+
+def current_codec() -> Codec:
+    return _codec
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return _codec.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    return _codec.dumps(obj)
@@ -0,0 +1,220 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from app.db.services import RedisClient, change_listener
+from app.db.models import Run, TradeSettings
+
+from app.exchange.user_trade.user_trade import TradeBot, SAFETY_POLL_INTERVAL
+from app.exchange.user_trade.records import Candidate, build_candidates
+
+logger=logging.getLogger('trading')
+
+# Per-user passes scheduled by the engine
+HEDGE_JOB='hedge'
+POSITIONS_JOB='positions'
+ENTRY_JOB='entry'
+# Next pass of a job that failed or had nothing to work on
+JOB_RETRY_DELAY=10
+
+
+class MarketState:
+    """
+    Market data shared by every user of the engine, read from Redis once per
+    refresh instead of once per TradeBot.
+    """
+
+    def __init__(self, redis_client: RedisClient, info_interval: float = 60):
+        self.redis_client = redis_client
+        self.info_interval = info_interval
+        self.coins_info: Dict[str, Dict] = {}
+        self.candidates: List[Candidate] = []
+        self.updated_at = 0.0
+        self._info_updated_at = 0.0
+
+    async def refresh(self):
+        now = time.monotonic()
+        if now - self._info_updated_at > self.info_interval or not self.coins_info:
+            self.coins_info = await self.redis_client.get_all_coins_info()
+            self._info_updated_at = now
+
+        self.candidates = build_candidates(await self.redis_client.get_coins(), self.coins_info)
+        self.updated_at = now
+
+
+@dataclass
+class UserSlot:
+    bot: TradeBot
+    semaphore: asyncio.Semaphore
+    # job -> monotonic time its next pass is due
+    due: Dict[str, float] = field(default_factory=dict)
+    steps: List[asyncio.Task] = field(default_factory=list)
+
+    def jobs(self) -> Tuple[str, ...]:
+        state = self.bot.is_running
+        if state == Run.ACTIVE:
+            return HEDGE_JOB, POSITIONS_JOB, ENTRY_JOB
+        if state == Run.HEDGE:
+            return HEDGE_JOB, POSITIONS_JOB
+        return ()
+
+
+class TradingEngine:
+    """
+    Runs many users' TradeBots in one process.
+
+    Market state and trade settings are read once per tick for everybody.
+    A user has no loops of their own: the entry, hedge and position passes
+    (TradeBot.trade_step / hedge_step / positions_step) are short tasks
+    started by the scheduler when due. Users are served round-robin with a
+    global cap on concurrent steps and a per-user cap, so one slow account
+    cannot starve the others.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            redis_client: Optional[RedisClient] = None,
+            max_concurrent_steps: int = 50,
+            per_user_concurrency: int = 1,
+            tick: float = 1,
+            testnet: bool = True,
+            use_private_stream: bool = False,
+    ):
+        self.redis = redis
+        self.redis_client = redis_client or RedisClient(redis)
+        self.market = MarketState(self.redis_client)
+        self.settings = TradeSettings()
+        self.per_user_concurrency = per_user_concurrency
+        self.tick = tick
+        self.testnet = testnet
+        self.use_private_stream = use_private_stream
+
+        self.users: Dict[int, UserSlot] = {}
+        self._steps = asyncio.Semaphore(max_concurrent_steps)
+        self._offset = 0
+        self._running = False
+        self._settings_changed = asyncio.Event()
+        self._settings_at = 0.0
+
+    # ---- lifecycle -------------------------------------------------------
+
+    async def start_user(self, user_id: int, user_data: Dict, state: Run = Run.ACTIVE) -> TradeBot:
+        if user_id in self.users:
+            self.set_state(user_id, state)
+            return self.users[user_id].bot
+
+        if not self.users:
+            await self.update_settings()
+
+        bot = TradeBot(user_id, user_data, self.redis, self.redis_client, use_private_stream=self.use_private_stream)
+        bot.settings = self.settings
+        bot.set_client(self.testnet)
+        await bot.init_hp_manager()
+        bot.is_running = state
+        await bot.start_background(standalone=False)
+
+        self.users[user_id] = UserSlot(bot=bot, semaphore=asyncio.Semaphore(self.per_user_concurrency))
+        logger.info(f'Engine: user {user_id} started ({state.value})')
+        return bot
+
+    def set_state(self, user_id: int, state: Run):
+        slot = self.users.get(user_id)
+        if slot:
+            slot.bot.is_running = state
+
+    def pause_user(self, user_id: int):
+        """Stop opening new positions, hedging of open ones goes on."""
+        self.set_state(user_id, Run.HEDGE)
+
+    def resume_user(self, user_id: int):
+        self.set_state(user_id, Run.ACTIVE)
+
+    async def stop_user(self, user_id: int):
+        slot = self.users.pop(user_id, None)
+        if slot is None:
+            return
+        slot.bot.is_running = Run.OFF
+        for task in slot.steps:
+            task.cancel()
+        await slot.bot.shutdown()
+        logger.info(f'Engine: user {user_id} stopped')
+
+    def state_of(self, user_id: int) -> Run:
+        slot = self.users.get(user_id)
+        return slot.bot.is_running if slot else Run.OFF
+
+    # ---- scheduler -------------------------------------------------------
+
+    async def update_settings(self):
+        self._settings_changed.clear()
+        self.settings.update((await self.redis_client.get_all_trade_settings()).to_dict())
+        self._settings_at = time.monotonic()
+
+    def _on_settings_changed(self, _):
+        self._settings_changed.set()
+
+    async def run(self):
+        self._running = True
+        listener = change_listener(self.redis)
+        listener.subscribe(RedisClient.SETTINGS_TOPIC, self._on_settings_changed)
+        try:
+            while self._running:
+                try:
+                    # Pushed on change, polled only as a safety net
+                    if self._settings_changed.is_set() or time.monotonic() - self._settings_at > SAFETY_POLL_INTERVAL:
+                        await self.update_settings()
+                    if any(slot.bot.is_running == Run.ACTIVE for slot in self.users.values()):
+                        await self.market.refresh()
+                    self._schedule()
+                except Exception as e:
+                    logger.exception(e)
+                await asyncio.sleep(self.tick)
+        finally:
+            listener.unsubscribe(RedisClient.SETTINGS_TOPIC, self._on_settings_changed)
+            await self.close()
+
+    def _schedule(self):
+        now = time.monotonic()
+        user_ids = list(self.users)
+        if not user_ids:
+            return
+
+        # Rotate the starting point so the same users are not always served first
+        self._offset = (self._offset + 1) % len(user_ids)
+        for user_id in user_ids[self._offset:] + user_ids[:self._offset]:
+            slot = self.users[user_id]
+            slot.steps = [task for task in slot.steps if not task.done()]
+            # Longest overdue first, a frequent job cannot starve the others of the user
+            for job in sorted(slot.jobs(), key=lambda job: slot.due.get(job, 0.0)):
+                if len(slot.steps) >= self.per_user_concurrency:
+                    break
+                if slot.due.get(job, 0.0) > now:
+                    continue
+                slot.due[job] = float('inf')  # set by the step when it finishes
+                slot.steps.append(asyncio.create_task(self._step(slot, job), name=f'{job}:{user_id}'))
+
+    async def _step(self, slot: UserSlot, job: str):
+        delay = JOB_RETRY_DELAY
+        bot = slot.bot
+        try:
+            async with self._steps, slot.semaphore:
+                if job == HEDGE_JOB:
+                    delay = await bot.hedge_step()
+                elif job == POSITIONS_JOB:
+                    delay = await bot.positions_step()
+                elif self.market.candidates:
+                    delay = await bot.trade_step(self.market.candidates)
+        except Exception as e:
+            logger.exception(f'Engine: {job} step of user {bot.user_id} failed {e}')
+        finally:
+            slot.due[job] = time.monotonic() + delay
+
+    async def close(self):
+        self._running = False
+        for user_id in list(self.users):
+            await self.stop_user(user_id)
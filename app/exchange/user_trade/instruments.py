@@ -0,0 +1,155 @@
+import math
+import time
+import asyncio
+import logging
+from decimal import Decimal
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.db.services import RedisClient, change_listener
+
+logger=logging.getLogger('trading')
+
+# x * scale can land an ulp or two under a whole number (0.3 * 10 = 2.9999999999999996),
+# such values are taken as that number, like Decimal(str(x)) does
+_ULPS = 2 * 2.0 ** -52
+
+
+def _units(value: float, scale: int) -> int:
+    y = value * scale
+    n = math.floor(y)
+    if (n + 1) - y <= y * _ULPS:
+        n += 1
+    return n
+
+
+def _units_array(values: np.ndarray, scale) -> np.ndarray:
+    y = values * scale
+    n = np.floor(y)
+    return n + ((n + 1) - y <= y * _ULPS)
+
+
+def _scale_of(step: float) -> Tuple[int, int]:
+    """step as units / 10**decimals with integer units, e.g. 0.025 -> (25, 3)."""
+    value = Decimal(str(step)).normalize()
+    decimals = max(-value.as_tuple().exponent, 0)
+    return int(value.scaleb(decimals)), decimals
+
+
+@dataclass(slots=True, frozen=True)
+class Instrument:
+    """
+    Filters of one linear symbol with precomputed integer scales: a price is
+    floored to tick_units / 10**price_decimals exactly, without Decimal.
+    """
+    symbol: str
+    tick_size: float
+    qty_step: float
+    min_order_qty: float
+    tick_units: int
+    price_scale: int
+    qty_units: int
+    qty_scale: int
+
+    @classmethod
+    def from_info(cls, symbol: str, info: Mapping) -> 'Instrument':
+        tick_size, qty_step = float(info['tickSize']), float(info['qtyStep'])
+        tick_units, price_decimals = _scale_of(tick_size)
+        qty_units, qty_decimals = _scale_of(qty_step)
+        return cls(
+            symbol=symbol,
+            tick_size=tick_size,
+            qty_step=qty_step,
+            min_order_qty=float(info.get('minOrderQty', qty_step)),
+            tick_units=tick_units,
+            price_scale=10 ** price_decimals,
+            qty_units=qty_units,
+            qty_scale=10 ** qty_decimals,
+        )
+
+    @staticmethod
+    def _floor(value: float, units: int, scale: int) -> float:
+        n = _units(value, scale)
+        return (n - n % units) / scale
+
+    def round_price(self, price: float) -> float:
+        return self._floor(price, self.tick_units, self.price_scale)
+
+    def round_qty(self, qty: float) -> float:
+        return self._floor(qty, self.qty_units, self.qty_scale)
+
+    def order_qty(self, qty: float) -> float:
+        """Quantity floored to the step, but not below the minimal order."""
+        return max(self.round_qty(qty), self.min_order_qty)
+
+    def round_prices(self, prices: np.ndarray) -> np.ndarray:
+        n = _units_array(np.asarray(prices, dtype=float), self.price_scale)
+        return (n - n % self.tick_units) / self.price_scale
+
+
+class InstrumentRegistry:
+    """
+    Process-wide copy of coins_info. Reloaded when the parser publishes a
+    change, or after max_age as a safety net.
+    """
+
+    def __init__(self, max_age: float = 3600, missing_retry: float = 10):
+        self.max_age = max_age
+        self.missing_retry = missing_retry
+        self._items: Dict[str, Instrument] = {}
+        self._stale = True
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._listening = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._items
+
+    def load(self, data: Mapping[str, Mapping]):
+        items = {}
+        for symbol, info in data.items():
+            try:
+                items[symbol] = Instrument.from_info(symbol, info)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f'Bad instrument info {symbol}: {e}')
+        self._items = items
+        self._loaded_at = time.monotonic()
+        self._stale = False
+
+    def mark_stale(self, _=None):
+        self._stale = True
+
+    async def refresh(self, redis_client: RedisClient, force: bool = False):
+        if not self._listening:
+            change_listener(redis_client.redis).subscribe(RedisClient.COINS_INFO_TOPIC, self.mark_stale)
+            self._listening = True
+        if not (force or self._stale or time.monotonic() - self._loaded_at > self.max_age):
+            return
+        async with self._lock:
+            if force or self._stale or time.monotonic() - self._loaded_at > self.max_age:
+                self.load(await redis_client.get_all_coins_info())
+
+    async def get(self, redis_client: RedisClient, symbol: str) -> Optional[Instrument]:
+        await self.refresh(redis_client)
+        instrument = self._items.get(symbol)
+        if instrument is None and time.monotonic() - self._loaded_at > self.missing_retry:
+            # Listed after the last load
+            await self.refresh(redis_client, force=True)
+            instrument = self._items.get(symbol)
+        return instrument
+
+    def round_prices(self, symbols: Iterable[str], prices: np.ndarray) -> np.ndarray:
+        """Vectorized round_price over several symbols, unknown ones give nan."""
+        symbols = list(symbols)
+        units = np.array([self._items[s].tick_units if s in self._items else np.nan for s in symbols], dtype=float)
+        scale = np.array([self._items[s].price_scale if s in self._items else np.nan for s in symbols], dtype=float)
+        n = _units_array(np.asarray(prices, dtype=float), scale)
+        return (n - n % units) / scale
+
+
+instruments = InstrumentRegistry()
@@ -1,14 +1,22 @@
 import json
-from typing import Dict, Optional, Hashable, List, Union
+import math
+import base64
+import struct
+import asyncio
+import logging
+from typing import Dict, Optional, Hashable, List, Mapping, Set, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+import numpy as np
 import pandas as pd
 from redis.asyncio import Redis
 from .utils import safe_float
 
 from app.db.models import TradeSettings
 
+logger=logging.getLogger('trading')
+
 
 class PositionIdx(int, Enum):
     LONG = 1
@@ -18,7 +26,45 @@ class PositionMain(str, Enum):
     MAIN = 'main'
     HEDGE = 'hedge'
 
-@dataclass
+class Durability(str, Enum):
+    IMMEDIATE = 'immediate'  # every change is written before the call returns
+    BATCH = 'batch'          # changes wait for flush(), e.g. at the end of a loop pass
+    TIMER = 'timer'          # as batch, plus a background flush every flush_interval
+
+# Compact Redis value: fixed struct layout per leg, strings length-prefixed,
+# base64 on top because the shared Redis client decodes responses to str.
+PACK_VERSION = 1
+HAS_MAIN, HAS_SECOND = 1, 2
+_HEADER = struct.Struct('<BB')       # version, flags
+_MAIN = struct.Struct('<dddBdd')     # size, amount, entry_price, position_idx, take_profit_price, tracking_price
+_SECOND = struct.Struct('<dddBd')    # size, amount, entry_price, position_idx, stop_loss_price
+_STR_LEN = struct.Struct('<H')
+_NONE_LEN = 0xFFFF
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+def _pack_str(value: Optional[str], out: List[bytes]):
+    if value is None:
+        out.append(_STR_LEN.pack(_NONE_LEN))
+        return
+    raw = str(value).encode()
+    out.append(_STR_LEN.pack(len(raw)))
+    out.append(raw)
+
+def _unpack_str(data: bytes, offset: int) -> Tuple[Optional[str], int]:
+    (length,) = _STR_LEN.unpack_from(data, offset)
+    offset += _STR_LEN.size
+    if length == _NONE_LEN:
+        return None, offset
+    return data[offset:offset + length].decode(), offset + length
+
+
+@dataclass(slots=True)
 class Position:
     size: float
     amount:float
@@ -39,7 +85,7 @@ class Position:
             data["position_idx"] = PositionIdx(data["position_idx"])
         return cls(**data)
 
-@dataclass
+@dataclass(slots=True)
 class MainPosition(Position):
     take_profit_price: float
     tracking_price: Optional[float] = None
@@ -56,7 +102,22 @@ class MainPosition(Position):
         return cls(**data)
 
 
-@dataclass
+    def pack(self, out: List[bytes]):
+        out.append(_MAIN.pack(self.size, self.amount, self.entry_price, self.position_idx,
+                              self.take_profit_price, _nan_if_none(self.tracking_price)))
+        _pack_str(self.tpsl_order_id, out)
+        _pack_str(self.updated_time, out)
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int) -> Tuple['MainPosition', int]:
+        size, amount, entry_price, position_idx, take_profit_price, tracking_price = _MAIN.unpack_from(data, offset)
+        tpsl_order_id, offset = _unpack_str(data, offset + _MAIN.size)
+        updated_time, offset = _unpack_str(data, offset)
+        return cls(size, amount, entry_price, PositionIdx(position_idx), tpsl_order_id, updated_time,
+                   take_profit_price, _none_if_nan(tracking_price)), offset
+
+
+@dataclass(slots=True)
 class SecondaryPosition(Position):
     stop_loss_price: float
 
@@ -71,7 +132,20 @@ class SecondaryPosition(Position):
             data["position_idx"] = PositionIdx(data["position_idx"])
         return cls(**data)
 
-@dataclass
+    def pack(self, out: List[bytes]):
+        out.append(_SECOND.pack(self.size, self.amount, self.entry_price, self.position_idx, self.stop_loss_price))
+        _pack_str(self.tpsl_order_id, out)
+        _pack_str(self.updated_time, out)
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int) -> Tuple['SecondaryPosition', int]:
+        size, amount, entry_price, position_idx, stop_loss_price = _SECOND.unpack_from(data, offset)
+        tpsl_order_id, offset = _unpack_str(data, offset + _SECOND.size)
+        updated_time, offset = _unpack_str(data, offset)
+        return cls(size, amount, entry_price, PositionIdx(position_idx), tpsl_order_id, updated_time,
+                   stop_loss_price), offset
+
+@dataclass(slots=True)
 class HedgePosition:
     coin: str
     main_position: Optional[MainPosition] = None
@@ -98,34 +172,199 @@ class HedgePosition:
             result.secondary_position = SecondaryPosition.from_dict(data["secondary_position"])
         return result
 
+    def pack(self) -> str:
+        flags = (HAS_MAIN if self.main_position else 0) | (HAS_SECOND if self.secondary_position else 0)
+        out = [_HEADER.pack(PACK_VERSION, flags)]
+        if self.main_position:
+            self.main_position.pack(out)
+        if self.secondary_position:
+            self.secondary_position.pack(out)
+        return base64.b64encode(b''.join(out)).decode('ascii')
+
+    @classmethod
+    def unpack(cls, coin: str, raw: str) -> 'HedgePosition':
+        data = base64.b64decode(raw)
+        version, flags = _HEADER.unpack_from(data)
+        if version != PACK_VERSION:
+            raise ValueError(f'Unknown position format {version} for {coin}')
+        result = cls(coin=coin)
+        offset = _HEADER.size
+        if flags & HAS_MAIN:
+            result.main_position, offset = MainPosition.unpack(data, offset)
+        if flags & HAS_SECOND:
+            result.secondary_position, offset = SecondaryPosition.unpack(data, offset)
+        return result
+
+
+def decode_position(coin: str, raw: str) -> Tuple[HedgePosition, bool]:
+    """Reads both formats, the flag is True for a legacy JSON value that should be rewritten."""
+    if raw.startswith('{'):
+        return HedgePosition.from_dict(json.loads(raw)), True
+    return HedgePosition.unpack(coin, raw), False
+
+
+
+class TriggerIndex:
+    """
+    Tracking prices of main positions still waiting for a hedge, as sorted
+    arrays per side, so a batch of prices is checked in one vectorized pass.
+
+    Every coin has its own threshold, so arrays are sorted by symbol (to
+    line them up with the prices) rather than by price.
+    """
+
+    def __init__(self):
+        self.long_symbols: List[str] = []
+        self.long_prices = np.empty(0)
+        self.short_symbols: List[str] = []
+        self.short_prices = np.empty(0)
+
+    def build(self, positions: Mapping[str, HedgePosition]):
+        longs, shorts = {}, {}
+        for coin, position in positions.items():
+            main = position.main_position
+            if not main or position.secondary_position or not main.tracking_price:
+                continue
+            if main.position_idx == PositionIdx.LONG:
+                longs[coin] = main.tracking_price
+            else:
+                shorts[coin] = main.tracking_price
+
+        self.long_symbols = sorted(longs)
+        self.long_prices = np.array([longs[coin] for coin in self.long_symbols], dtype=float)
+        self.short_symbols = sorted(shorts)
+        self.short_prices = np.array([shorts[coin] for coin in self.short_symbols], dtype=float)
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.long_symbols + self.short_symbols
+
+    @staticmethod
+    def _current(symbols: List[str], prices: Mapping[str, float]) -> np.ndarray:
+        # Missing / zero prices become nan and never trigger
+        return np.fromiter((prices.get(coin) or np.nan for coin in symbols), dtype=float, count=len(symbols))
+
+    def crossed(self, prices: Mapping[str, float]) -> List[str]:
+        """Coins whose price crossed the tracking price: long at or below it, short at or above it."""
+        result = []
+        if self.long_symbols:
+            hit = self._current(self.long_symbols, prices) <= self.long_prices
+            result.extend(np.asarray(self.long_symbols, dtype=object)[hit])
+        if self.short_symbols:
+            hit = self._current(self.short_symbols, prices) >= self.short_prices
+            result.extend(np.asarray(self.short_symbols, dtype=object)[hit])
+        return result
 
 
 class HedgePositionManager:
-    def __init__(self, user_id: int, redis: Redis, settings: TradeSettings):
+    def __init__(self, user_id: int, redis: Redis, settings: TradeSettings,
+                 durability: Durability = Durability.IMMEDIATE, flush_interval: float = 0.5):
         self.user_id = user_id
         self.redis = redis
         self.redis_key = f"hedge_positions:{self.user_id}"
         self.positions: Dict[str, HedgePosition] = {}
         self.settings = settings
+        self.triggers = TriggerIndex()
+        self._triggers_dirty = True
+
+        # Unit of work: changed coins are written together by flush()
+        self.durability = Durability(durability)
+        self.flush_interval = flush_interval
+        self._dirty: Set[str] = set()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _invalidate(self):
+        self._triggers_dirty = True
+
+    def _index(self) -> TriggerIndex:
+        if self._triggers_dirty:
+            self.triggers.build(self.positions)
+            self._triggers_dirty = False
+        return self.triggers
+
+    def trigger_symbols(self) -> List[str]:
+        """Coins whose price is needed by hedge_candidates."""
+        return self._index().symbols
+
+    def hedge_candidates(self, prices: Mapping[str, float]) -> List[str]:
+        """Batch version of should_create_hedge."""
+        return self._index().crossed(prices)
 
     async def load_from_redis(self):
         raw_data = await self.redis.hgetall(self.redis_key)
         self.positions = {}
 
+        legacy = set()
         for coin, position in raw_data.items():
-            self.positions[coin] = HedgePosition.from_dict(json.loads(position))
+            self.positions[coin], is_legacy = decode_position(coin, position)
+            if is_legacy:
+                legacy.add(coin)
+        self._invalidate()
+
+        if legacy:
+            # Old JSON values are rewritten in the packed format
+            self._dirty |= legacy
+            await self.flush()
+            logger.info(f'User {self.user_id}: {len(legacy)} positions migrated from JSON')
+
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    async def _changed(self, coin: str):
+        self._dirty.add(coin)
+        if self.durability == Durability.IMMEDIATE:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write every changed coin in one MULTI: HSET for the present ones, HDEL for the removed."""
+        if not self._dirty:
+            return 0
+        coins, self._dirty = self._dirty, set()
+
+        mapping = {coin: self.positions[coin].pack() for coin in coins if coin in self.positions}
+        removed = [coin for coin in coins if coin not in self.positions]
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                if mapping:
+                    pipe.hset(self.redis_key, mapping=mapping)
+                if removed:
+                    pipe.hdel(self.redis_key, *removed)
+                await pipe.execute()
+        except Exception:
+            # Written on the next flush with whatever state they have by then
+            self._dirty |= coins
+            raise
+        return len(coins)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f'User {self.user_id}: positions flush failed {e}')
+
+    def start(self):
+        if self.durability == Durability.TIMER and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
 
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
 
     async def save_position_to_redis(self, coin: str):
         if coin in self.positions:
-            position_data = self.positions[coin].to_dict()
-            await self.redis.hset(self.redis_key, coin, json.dumps(position_data))
+            await self.redis.hset(self.redis_key, coin, self.positions[coin].pack())
         else:
             await self.redis.hdel(self.redis_key, coin)
 
 
     async def save_all_positions_to_redis(self):
-        mapping={key: json.dumps(value.to_dict()) for key,value in self.positions.items()}
+        mapping={key: value.pack() for key,value in self.positions.items()}
         await self.redis.hset(self.redis_key, mapping=mapping)
 
 
@@ -191,10 +430,11 @@ class HedgePositionManager:
             tracking_price=tracking_price,
             updated_time=updated_time,
         )
+        self._invalidate()
 
 
 
-        await self.save_position_to_redis(coin)
+        await self._changed(coin)
 
 
     async def set_secondary_position(
@@ -225,7 +465,8 @@ class HedgePositionManager:
                     stop_loss_price=stop_loss,
                     tpsl_order_id=stop_loss_order_id,
                 )
-                await self.save_position_to_redis(coin)
+                self._invalidate()
+                await self._changed(coin)
             except KeyError:
                 pass
 
@@ -240,7 +481,8 @@ class HedgePositionManager:
             self.positions[coin].main_position = None
             if not self.positions[coin].secondary_position:
                 del self.positions[coin]
-            await self.save_position_to_redis(coin)
+            self._invalidate()
+            await self._changed(coin)
             return pos
 
     async def remove_secondary_position(self, coin: str) -> Optional[SecondaryPosition]:
@@ -249,13 +491,15 @@ class HedgePositionManager:
             self.positions[coin].secondary_position=None
             if not self.positions[coin].main_position:
                 del self.positions[coin]
-            await self.save_position_to_redis(coin)
+            self._invalidate()
+            await self._changed(coin)
             return pos
 
     async def remove_all_position(self, coin: str) -> Optional[HedgePosition]:
         if coin in self.positions:
             pos=self.positions.pop(coin)
-            await self.save_position_to_redis(coin)
+            self._invalidate()
+            await self._changed(coin)
             return pos
 
     async def sync_position_with_db(self,positions: pd.DataFrame):
@@ -0,0 +1,94 @@
+import time
+import logging
+from typing import Dict, TYPE_CHECKING
+
+from app.exchange.websocket.bybit_websocket import AsyncWebSocketManager, PRIVATE_URL
+
+from .reconcile import same_leg
+from .utils import safe_float, send_notification
+
+if TYPE_CHECKING:
+    from .user_trade import TradeBot
+
+
+logger=logging.getLogger('trading')
+
+PRIVATE_TOPICS = ['position', 'order', 'execution']
+
+
+class PrivateStream:
+    """
+    Pushes the user's position / order / execution events into the TradeBot's
+    HedgePositionManager, so REST is only needed for periodic reconciliation.
+
+    A tracked leg is dropped once Bybit reports it closed or changed, same rule
+    and tolerances as TradeBot.get_delete_positions (reconcile.same_leg).
+    """
+
+    def __init__(self, bot: 'TradeBot', testnet: bool = False):
+        self.bot = bot
+        self.ws = AsyncWebSocketManager(
+            self._on_message,
+            testnet=testnet,
+            api_key=bot.api_key,
+            api_secret=bot.api_secret,
+        )
+        self.last_event = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self.ws.running
+
+    async def start(self) -> bool:
+        await self.ws.subscribe_topics(PRIVATE_TOPICS, self._on_message)
+        connected = await self.ws.connect(PRIVATE_URL)
+        if not connected:
+            logger.warning(f'User {self.bot.user_id}: private stream unavailable, using REST polling')
+        return connected
+
+    async def stop(self):
+        await self.ws.close()
+
+    async def _on_message(self, message: Dict):
+        topic = message.get('topic')
+        if topic not in PRIVATE_TOPICS:
+            return
+        self.last_event = time.time()
+
+        for event in message.get('data', []):
+            if event.get('category') not in (None, 'linear'):
+                continue
+            try:
+                if topic == 'position':
+                    await self._on_position(event)
+                elif topic == 'order':
+                    await self._on_order(event)
+                else:
+                    logger.debug(f"User {self.bot.user_id} execution {event.get('symbol')} "
+                                 f"{event.get('side')} {event.get('execQty')}@{event.get('execPrice')}")
+            except Exception as e:
+                logger.exception(f'User {self.bot.user_id}: error in {topic} event {e}')
+
+    async def _on_position(self, event: Dict):
+        hp_manager = self.bot.hp_manager
+        symbol = event.get('symbol')
+        position_idx = int(safe_float(event.get('positionIdx')))
+        size = safe_float(event.get('size'))
+        entry_price = safe_float(event.get('entryPrice', event.get('avgPrice')))
+
+        main = hp_manager.get_main_position(symbol)
+        second = hp_manager.get_second_position(symbol)
+
+        if main and main.position_idx == position_idx:
+            if size == 0 or not same_leg(size, entry_price, main.size, main.entry_price):
+                await hp_manager.remove_main_position(symbol)
+                logger.debug(f'Position MAIN is over, coin {symbol}')
+        elif second and second.position_idx == position_idx:
+            if size == 0 or not same_leg(size, entry_price, second.size, second.entry_price):
+                await hp_manager.remove_secondary_position(symbol)
+                logger.debug(f'Position SECOND is over, coin {symbol}')
+
+    async def _on_order(self, event: Dict):
+        if event.get('stopOrderType') in ('TakeProfit', 'StopLoss') and event.get('orderStatus') == 'Filled':
+            if self.bot.is_notification:
+                await send_notification(self.bot.user_id, event, event.get('symbol'))
@@ -0,0 +1,83 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from .utils import safe_float
+
+PositionKey = Tuple[str, int]
+
+# Sizes and prices went through str -> float on both sides (REST, websocket, Redis)
+REL_TOL = 1e-9
+ABS_TOL = 1e-12
+
+
+@dataclass(slots=True)
+class PositionDiff:
+    """
+    added   - open on the exchange, not tracked (api records)
+    removed - tracked, no longer open on the exchange (tracked records)
+    changed - tracked, but size or entry price differ on the exchange (tracked records)
+    """
+    added: Dict[PositionKey, Dict] = field(default_factory=dict)
+    removed: Dict[PositionKey, Dict] = field(default_factory=dict)
+    changed: Dict[PositionKey, Dict] = field(default_factory=dict)
+
+    @property
+    def stale(self) -> List[Dict]:
+        """Tracked legs that have to be dropped."""
+        return list(self.removed.values()) + list(self.changed.values())
+
+
+def _close(a: float, b: float, rel_tol: float, abs_tol: float) -> bool:
+    return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+
+
+def same_leg(size: float, entry_price: float, tracked_size: float, tracked_entry_price: float,
+             rel_tol: float = REL_TOL, abs_tol: float = ABS_TOL) -> bool:
+    """The exchange still holds the tracked leg: same size and entry price within tolerance."""
+    return (_close(size, tracked_size, rel_tol, abs_tol)
+            and _close(entry_price, tracked_entry_price, rel_tol, abs_tol))
+
+
+def index_api(positions: Iterable[Mapping]) -> Dict[PositionKey, Tuple[float, float, Mapping]]:
+    """/v5/position/list records by (symbol, positionIdx), closed (size 0) ones are skipped."""
+    result = {}
+    for position in positions:
+        symbol = position.get('symbol')
+        size = safe_float(position.get('size'))
+        if not symbol or not size:
+            continue
+        key = (symbol, int(safe_float(position.get('positionIdx'))))
+        result[key] = (size, safe_float(position.get('avgPrice')), position)
+    return result
+
+
+def reconcile(
+        tracked: Iterable[Mapping],
+        api_positions: Iterable[Mapping],
+        rel_tol: float = REL_TOL,
+        abs_tol: float = ABS_TOL,
+) -> PositionDiff:
+    """
+    Linear diff of HedgePositionManager.all_to_dict() against the exchange.
+    Floats are compared with a tolerance, the values went through str -> float on both sides.
+    """
+    api = index_api(api_positions)
+    diff = PositionDiff()
+
+    seen = set()
+    for position in tracked:
+        key = (position['symbol'], int(position['position_idx']))
+        seen.add(key)
+        current = api.get(key)
+        if current is None:
+            diff.removed[key] = position
+            continue
+        size, entry_price, _ = current
+        if not same_leg(size, entry_price, position['size'], position['entry_price'], rel_tol, abs_tol):
+            diff.changed[key] = position
+
+    for key, (_, _, position) in api.items():
+        if key not in seen:
+            diff.added[key] = position
+    return diff
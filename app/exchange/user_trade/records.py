@@ -0,0 +1,102 @@
+from typing import Collection, Dict, Iterable, List, Mapping, NamedTuple, Optional, Union
+
+from .utils import safe_float
+
+TPSL_ORDER_TYPES = ('TakeProfit', 'StopLoss')
+
+
+class OrderRecord(NamedTuple):
+    """Fields of a /v5/order record the bot filters on, the API dict stays in `raw`."""
+    order_id: str
+    symbol: str
+    side: str
+    order_status: str
+    stop_order_type: str
+    raw: Dict
+
+    @classmethod
+    def from_api(cls, order: Dict) -> 'OrderRecord':
+        return cls(
+            order.get('orderId', ''),
+            order.get('symbol', ''),
+            order.get('side', ''),
+            order.get('orderStatus', ''),
+            order.get('stopOrderType', ''),
+            order,
+        )
+
+
+class PositionRecord(NamedTuple):
+    symbol: str
+    position_idx: int
+    side: str
+    size: float
+    avg_price: float
+    raw: Dict
+
+    @classmethod
+    def from_api(cls, position: Dict) -> 'PositionRecord':
+        return cls(
+            position.get('symbol', ''),
+            int(safe_float(position.get('positionIdx'))),
+            position.get('side', ''),
+            safe_float(position.get('size')),
+            safe_float(position.get('avgPrice')),
+            position,
+        )
+
+
+class Candidate(NamedTuple):
+    """A coin with an entry signal and known instrument info (filters: see instruments)."""
+    symbol: str
+    long: bool
+    short: bool
+
+
+def select_orders(orders: Iterable[Dict], order_id: Union[str, Collection[str], None] = None,
+                  side: str = '') -> List[OrderRecord]:
+    """
+    Orders with the given id(s). With `side`, only TP/SL orders of the opposite
+    side, i.e. the ones closing a position opened on `side`.
+    """
+    if isinstance(order_id, str):
+        order_id = (order_id,)
+    result = []
+    for order in orders:
+        if not order:
+            continue
+        record = OrderRecord.from_api(order)
+        if order_id and record.order_id not in order_id:
+            continue
+        if side and (record.side == side or record.stop_order_type not in TPSL_ORDER_TYPES):
+            continue
+        result.append(record)
+    return result
+
+
+def select_positions(positions: Iterable[Dict], side: Optional[str] = None,
+                     open_only: bool = False) -> List[PositionRecord]:
+    result = []
+    for position in positions:
+        if not position:
+            continue
+        record = PositionRecord.from_api(position)
+        if side is not None and record.side != side:
+            continue
+        if open_only and not record.size:
+            continue
+        result.append(record)
+    return result
+
+
+def build_candidates(coins: Mapping[str, Mapping], coins_info: Mapping[str, Mapping]) -> List[Candidate]:
+    """Signalled coins that have instrument info, in the order of `coins`."""
+    result = []
+    for symbol, signal in coins.items():
+        long, short = bool(signal.get('Long')), bool(signal.get('Short'))
+        if not (long or short):
+            continue
+        if symbol not in coins_info:
+            continue
+        result.append(Candidate(symbol, long, short))
+    return result
@@ -1,23 +1,56 @@
+import time
 import logging
 import asyncio
-from typing import Dict,Optional, Hashable, List,Union
+from typing import Dict,Optional, Hashable, List,Set,Tuple,Union
 
-import numpy as np
-import pandas as pd
 from redis.asyncio import Redis
 
-from app.db.services import RedisClient
+from app.db.services import RedisClient, change_listener
 from app.db.models import Run,TradeSettings
 
 
 from app.exchange.bybit_async import BybitRequester
 from app.exchange.bybit_async import get_positions,get_order,get_mark_price,set_leverage,get_balance,get_all_position, place_order,switch_position_mode
 
-from app.exchange.user_trade.utils import (round_step_size, proof_result)
-from app.exchange.user_trade.orders import HedgePositionManager,PositionIdx
+from app.exchange.user_trade.utils import (proof_result, wait_event)
+from app.exchange.user_trade.orders import HedgePositionManager,PositionIdx,Durability
+from app.exchange.user_trade.private_stream import PrivateStream
+from app.exchange.user_trade.reconcile import reconcile
+from app.exchange.user_trade.instruments import instruments
+from app.exchange.user_trade.records import Candidate, build_candidates, select_orders, select_positions
 
 logger=logging.getLogger('trading')
 
+# Reads shared by coin_in_trade/have_both_side_position/get_position_due_side and fetch_coin tasks
+READ_CACHE_TTL={'/v5/position/list': 0.5, '/v5/account/wallet-balance': 1.0}
+
+# check_positions period while the private stream pushes position updates
+RECONCILE_INTERVAL=60
+
+# Settings and run state are pushed through pub/sub, this poll only covers lost messages
+SAFETY_POLL_INTERVAL=30
+
+# check_hedge period, a pass is one HMGET however many positions are open
+HEDGE_INTERVAL=1
+# A crossed coin whose hedge was not placed (both sides already open, no price,
+# order refused) is not tried again for this long
+HEDGE_RETRY_COOLDOWN=30
+
+# Entry pipeline: concurrent entries per stage, pass period and admission limits
+ENTRY_STAGES={'check': 10, 'order': 3, 'settle': 5}
+ENTRY_INTERVAL=1
+MAX_POSITIONS=80
+ORDER_ENDPOINT='/v5/order/create'
+POSITION_MODE_INTERVAL=300
+# Leverage set for a coin is trusted this long, then sent again (fixes manual changes on the exchange)
+LEVERAGE_TTL=300
+# A coin whose entry was refused or failed is not retried for this long, unless its signal changes
+ENTRY_RETRY_COOLDOWN=60
+
+# How tracked positions reach Redis, see orders.Durability
+POSITIONS_DURABILITY=Durability.TIMER
+POSITIONS_FLUSH_INTERVAL=0.5
+
 
 import sys
 if sys.platform.startswith('win'):
@@ -25,7 +58,7 @@ if sys.platform.startswith('win'):
 
 
 class TradeBot:
-    def __init__(self,user_id:int,user_data: Dict,redis: Redis,redis_client:RedisClient):
+    def __init__(self,user_id:int,user_data: Dict,redis: Redis,redis_client:RedisClient,use_private_stream:bool=False):
         self.is_running: Run= Run.ACTIVE
 
         self.user_id = user_id
@@ -41,11 +74,28 @@ class TradeBot:
 
         self.is_notification=True
 
+        self.testnet=False
+        self.use_private_stream=use_private_stream
+        self.private_stream:Optional[PrivateStream]=None
+
         self.all_task=[]
 
+        # Entry pipeline state
+        self.stages={name: asyncio.Semaphore(limit) for name,limit in ENTRY_STAGES.items()}
+        self.entering:Set[str]=set()
+        self.entry_tasks:Set[asyncio.Task]=set()
+        # symbol -> (leverage, time) of the last successful set_leverage
+        self.leverage_set:Dict[str,Tuple[float,float]]={}
+        self.mode_checked_at=0.0
+        # symbol -> ((long, short) signal, time) of the last entry that did not open a position
+        self.rejected:Dict[str,Tuple[Tuple[bool,bool],float]]={}
+        # symbol -> time of the last hedge attempt that placed no order
+        self.hedge_rejected:Dict[str,float]={}
+
 
     def set_client(self,testnet:bool = False):
-        self.client:BybitRequester=BybitRequester(self.api_key,self.api_secret,testnet=testnet)
+        self.testnet=testnet
+        self.client:BybitRequester=BybitRequester(self.api_key,self.api_secret,testnet=testnet,read_cache_ttl=READ_CACHE_TTL)
 
 
     async def update_settings(self):
@@ -53,8 +103,10 @@ class TradeBot:
 
 
     async def init_hp_manager(self):
-        self.hp_manager=HedgePositionManager(self.user_id,self.redis,self.settings)
+        self.hp_manager=HedgePositionManager(self.user_id,self.redis,self.settings,
+                                             durability=POSITIONS_DURABILITY,flush_interval=POSITIONS_FLUSH_INTERVAL)
         await self.hp_manager.load_from_redis()
+        self.hp_manager.start()
 
 
     async def initialize(self):
@@ -64,21 +116,39 @@ class TradeBot:
 
 
     async def check_settings(self):
-        while self.is_running!=Run.OFF:
-            await self.update_settings()
-            await asyncio.sleep(1)
+        changed=asyncio.Event()
+        on_change=lambda _: changed.set()
+        listener=change_listener(self.redis)
+        listener.subscribe(RedisClient.SETTINGS_TOPIC,on_change)
+        try:
+            while self.is_running!=Run.OFF:
+                changed.clear()
+                await self.update_settings()
+                await wait_event(changed,SAFETY_POLL_INTERVAL)
+        finally:
+            listener.unsubscribe(RedisClient.SETTINGS_TOPIC,on_change)
 
 
     async def check_running(self):
-        while True:
-            self.is_running=Run(await self.redis_client.get_is_run(self.user_id))
-            await asyncio.sleep(1)
-            if self.is_running==Run.OFF:
-                break
+        topic=f'{RedisClient.IS_RUN_KEY}:{self.user_id}'
+        changed=asyncio.Event()
+        on_change=lambda _: changed.set()
+        listener=change_listener(self.redis)
+        listener.subscribe(topic,on_change)
+        try:
+            while True:
+                changed.clear()
+                self.is_running=Run(await self.redis_client.get_is_run(self.user_id))
+                if self.is_running==Run.OFF:
+                    break
+                await wait_event(changed,SAFETY_POLL_INTERVAL)
+        finally:
+            listener.unsubscribe(topic,on_change)
 
 
-    async def have_balance(self):
-        balance=await get_balance(self.client)
+    async def have_balance(self,balance:Optional[Dict]=None):
+        if balance is None:
+            balance=await get_balance(self.client)
         if proof_result(balance,dict):
             available_balance=float(balance.get('totalAvailableBalance',0))
             total_balance=float(balance.get('totalMarginBalance',1))
@@ -88,16 +158,14 @@ class TradeBot:
 
 
     async def get_position_due_side(self,coin:Hashable,side:str) -> Dict:
-        positions=await get_positions(self.client,coin)
-        position=[position for position in positions if position['side']==side]
-        return position[0] if len(position)>0 else {}
+        positions=select_positions(await get_positions(self.client,coin),side=side)
+        return positions[0].raw if positions else {}
 
     async def have_both_side_position(self,coin: Hashable) -> bool:
         positions=await get_positions(self.client,coin)
         if proof_result(positions,list):
-            len_p=len(positions)
-            size=[float(position.get('size',0)) for position in positions]
-            return (len_p==2 and all(size))
+            positions=select_positions(positions)
+            return len(positions)==2 and all(position.size for position in positions)
         logger.warning('Position  does not list')
         return True
 
@@ -105,8 +173,7 @@ class TradeBot:
     async def coin_in_trade(self, coin: Hashable) -> bool:
         position=(await get_positions(self.client,coin))
         if proof_result(position,list):
-            size=[float(pos.get('size',0)) for pos in position]
-            return any(size)
+            return bool(select_positions(position,open_only=True))
         logger.warning('Position in coin_in_trade does not list')
         return True
 
@@ -119,55 +186,63 @@ class TradeBot:
             logger.warning('Orders_list in get_order is not a LIST')
             return {}
 
-        if not orders:
-            return {}
-
-        df = pd.DataFrame(orders)
-
-        if orderId:
-            if isinstance(orderId, list):
-                df = df[df['orderId'].isin(orderId)]
-            else:
-                df = df[df['orderId'] == orderId]
-
-        if side!='':
-            df = df[((df['side'] != side) & (df['stopOrderType'].isin(['TakeProfit', 'StopLoss'])))]
-        order_records = df.to_dict(orient='records')
-        return order_records[0] if order_records else {}
+        order_records = select_orders(orders, orderId, side)
+        return order_records[0].raw if order_records else {}
+
+    async def hedge_step(self) -> float:
+        """One hedge pass. Returns seconds until the next pass."""
+        # One HMGET for every coin waiting for a hedge, then one vectorized check
+        coins=self.hp_manager.trigger_symbols()
+        now=time.monotonic()
+        waiting=set(coins)
+        # Forgotten after the cooldown or once the coin has no main leg waiting for a hedge
+        self.hedge_rejected={symbol: at for symbol,at in self.hedge_rejected.items()
+                             if symbol in waiting and now-at<HEDGE_RETRY_COOLDOWN}
+        prices=await self.redis_client.get_mark_prices(coins)
+        for coin in self.hp_manager.hedge_candidates(prices):
+            if coin in self.hedge_rejected:
+                continue
+            hedged=False
+            try:
+                have_both_position=await self.have_both_side_position(coin)
+                if not have_both_position:
+                    hedged=await self.fetch_hedge_coin(coin)
+            except Exception as e:
+                logger.exception(e)
+            if not hedged:
+                self.hedge_rejected[coin]=time.monotonic()
+        return HEDGE_INTERVAL
 
     async def check_hedge(self):
         while self.is_running!=Run.OFF:
-            for coin in self.hp_manager.get_all_coins():
-                try:
-                    price=await self.redis_client.get_mark_price_coin(coin)
-                    should_hedge=self.hp_manager.should_create_hedge(coin,price)
-                    if should_hedge:
-                        have_both_position=await self.have_both_side_position(coin)
-                        if not have_both_position:
-                            await self.fetch_hedge_coin(coin)
-                except Exception as e:
-                    logger.exception(e)
-                await asyncio.sleep(0.1)
-            await asyncio.sleep(5)
+            delay=HEDGE_INTERVAL
+            try:
+                delay=await self.hedge_step()
+            except Exception as e:
+                logger.exception(e)
+            await asyncio.sleep(delay)
 
 
-    async def fetch_hedge_coin(self,coin:str):
+    async def fetch_hedge_coin(self,coin:str) -> bool:
+        """True when the hedge order was placed."""
         try:
-            coin=pd.Series((await self.redis_client.get_coin_info(coin))[coin],name=coin)
-            #price = float(await self.redis_client.get_mark_price_coin(coin.name))
-            price=await get_mark_price(self.client,coin.name)
+            instrument=await instruments.get(self.redis_client,coin)
+            if instrument is None:
+                logger.warning(f'No instrument info for {coin}')
+                return False
+            price=await get_mark_price(self.client,coin)
             if price == 0:
-                return
+                return False
 
-            position=self.hp_manager.get_main_position(coin.name)
+            position=self.hp_manager.get_main_position(coin)
 
             is_long=position.position_idx==PositionIdx.SHORT
             price_multiplier = 1 + ((self.settings.hedge_stop_loss_percentage / 100) * (1 if not is_long else -1))
-            sl_price = round_step_size(price * price_multiplier, coin.tickSize)
+            sl_price = instrument.round_price(price * price_multiplier)
 
             order = (await place_order(
                 self.client,
-                coin.name,
+                coin,
                 position.size,
                 is_long,
                 sl_price=sl_price
@@ -179,58 +254,61 @@ class TradeBot:
 
             order=order["result"]
             if not proof_result(order, dict):
-                return
+                return False
 
             await asyncio.sleep(1)
-            await self.after_fetch_coin(coin.name, order,is_hedge=True)
+            await self.after_fetch_coin(coin, order,is_hedge=True)
+            return True
 
         except Exception as e:
             logger.exception(e)
+            return False
+
 
 
+    def positions_interval(self) -> float:
+        """REST reconciliation is only a safety net while the private stream is up."""
+        if self.private_stream and self.private_stream.connected:
+            return RECONCILE_INTERVAL
+        return 5
+
+    async def positions_step(self) -> float:
+        """One pass dropping the tracked legs closed on the exchange. Returns seconds until the next pass."""
+        need_delete=await self.get_delete_positions()
+        if need_delete:
+            for pos in need_delete:
+                is_main=pos.get('is_main',True)
+                symbol=pos.get('symbol')
+
+                if symbol:
+                    if is_main:
+                        position=await self.hp_manager.remove_main_position(symbol)
+                    else:
+                        position=await self.hp_manager.remove_secondary_position(symbol)
+
+                    if self.is_notification:
+                        #order=await self.get_order(symbol,orderId=position.tpsl_order_id)
+                        logger.debug(f'Position {'MAIN' if is_main else 'SECOND'} is over, coin {symbol}')
+            # All removals of the pass in one round trip
+            await self.hp_manager.flush()
+        return self.positions_interval()
 
     async def check_positions(self):
         try:
             while self.is_running!=Run.OFF:
-                need_delete=await self.get_delete_positions()
-                if need_delete:
-                    for pos in need_delete:
-                        is_main=pos.get('is_main',True)
-                        symbol=pos.get('symbol')
-
-                        if symbol:
-                            if is_main:
-                                position=await self.hp_manager.remove_main_position(symbol)
-                            else:
-                                position=await self.hp_manager.remove_secondary_position(symbol)
-
-                            if self.is_notification:
-                                #order=await self.get_order(symbol,orderId=position.tpsl_order_id)
-                                logger.debug(f'Position {'MAIN' if is_main else 'SECOND'} is over, coin {symbol}')
-                await asyncio.sleep(5)
+                await asyncio.sleep(await self.positions_step())
         except Exception as e:
             logger.error(e)
 
     async def get_delete_positions(self) -> List[Dict]:
         result_db=self.hp_manager.all_to_dict()
+        if not result_db:
+            return []
         result_api=await get_all_position(self.client)
-        if not result_api[0] or not result_db:
-            return [{}]
-        positions_db = pd.DataFrame(result_db)[['symbol', 'size', 'entry_price', 'position_idx','is_main']]
-        positions_api = pd.DataFrame(result_api)[
-            ['symbol', 'size', 'avgPrice', 'positionIdx', ]].rename(columns={
-            'avgPrice': 'entry_price',
-            'positionIdx': 'position_idx'
-        }).astype({
-            'size': float,
-            'entry_price': float,
-            'position_idx': int
-        })
-        keys = ['symbol', 'size', 'entry_price', 'position_idx',]
-        keys_from_api = set(tuple(row) for row in positions_api[keys].to_numpy())
-        mask = ~positions_db[keys].apply(tuple, axis=1).isin(keys_from_api)
-        need_delete = positions_db[mask]
-        return need_delete.to_dict('records')
+        if result_api==[{}]:
+            # request failed, keep everything until the next pass
+            return []
+        return reconcile(result_db,result_api).stale
 
 
 
@@ -267,113 +345,194 @@ class TradeBot:
 
 
 
-    async def fetch_coin(self, coin: pd.Series) -> None:
+    async def fetch_coin(self, coin: Candidate, balance: Optional[Dict] = None) -> None:
+        """
+        Entry for one coin as a pipeline: check -> order -> settle, every stage
+        with its own concurrency limit (ENTRY_STAGES).
+        """
+        self.entering.add(coin.symbol)
+        entered=False
         try:
-            if await self.coin_in_trade(coin.name):
-                logger.debug(f"{coin.name} is trading. Pass.")
-                return
-
-            await set_leverage(self.client, coin.name, leverage=self.settings.leverage)
-
-            balance = await get_balance(self.client)
-            price = float(await self.redis_client.get_mark_price_coin(coin.name))
-            price=await get_mark_price(self.client,coin.name)
-            if not (proof_result(balance, dict) and price > 0):
-                logger.warning(
-                    f"Cannot get balance/price in fetch_coin\n"
-                    f"Price: {price}, Balance: {type(balance)}"
+            async with self.stages['check']:
+                in_trade, price = await asyncio.gather(
+                    self.coin_in_trade(coin.symbol),
+                    get_mark_price(self.client, coin.symbol),
                 )
-                return
-
-            available_balance = float(balance.get("totalMarginBalance", 0))
-            raw_amount = ((self.settings.size / 100) * available_balance) * self.settings.leverage / price
-            amount_coin = max(
-                round_step_size(raw_amount, coin.qtyStep),
-                coin.minOrderQty
-            )
-
-            price_multiplier = 1 + ((self.settings.take_profit / 100) * (1 if coin.Long else -1))
-            tp_price = round_step_size(price * price_multiplier, coin.tickSize)
-
-            order = (await place_order(
-                self.client,
-                coin.name,
-                amount_coin,
-                coin.Long,
-                tp_price=tp_price
-            ))
-            # if order['retCode']==10001:
-            #     logger.error(f'Failed to fetch coin {coin.name}\n'
-            #                  f'Price{price}\n'
-            #                  f'order:{order}')
+                if in_trade:
+                    logger.debug(f"{coin.symbol} is trading. Pass.")
+                    return
+
+                if balance is None:
+                    balance = await get_balance(self.client)
+                if not (proof_result(balance, dict) and price > 0):
+                    logger.warning(
+                        f"Cannot get balance/price in fetch_coin\n"
+                        f"Price: {price}, Balance: {type(balance)}"
+                    )
+                    return
+
+                instrument=await instruments.get(self.redis_client,coin.symbol)
+                if instrument is None:
+                    logger.warning(f'No instrument info for {coin.symbol}')
+                    return
+
+                # Leverage is only sent when it differs from what was set for the coin or the entry expired
+                leverage,set_at=self.leverage_set.get(coin.symbol,(None,0.0))
+                if leverage!=self.settings.leverage or time.monotonic()-set_at>LEVERAGE_TTL:
+                    if await set_leverage(self.client, coin.symbol, leverage=self.settings.leverage):
+                        self.leverage_set[coin.symbol]=(self.settings.leverage,time.monotonic())
+
+                available_balance = float(balance.get("totalMarginBalance", 0))
+                raw_amount = ((self.settings.size / 100) * available_balance) * self.settings.leverage / price
+                amount_coin = instrument.order_qty(raw_amount)
+
+                price_multiplier = 1 + ((self.settings.take_profit / 100) * (1 if coin.long else -1))
+                tp_price = instrument.round_price(price * price_multiplier)
+
+            async with self.stages['order']:
+                order = (await place_order(
+                    self.client,
+                    coin.symbol,
+                    amount_coin,
+                    coin.long,
+                    tp_price=tp_price
+                ))
 
             order=order["result"]
             if not proof_result(order, dict):
                 return
+            entered=True
 
-            await asyncio.sleep(1)
-            await self.after_fetch_coin(coin.name, order)
+            async with self.stages['settle']:
+                await asyncio.sleep(1)
+                await self.after_fetch_coin(coin.symbol, order)
 
         except Exception as e:
             logger.exception(e)
+        finally:
+            self.entering.discard(coin.symbol)
+            if not entered:
+                self.rejected[coin.symbol]=((coin.long,coin.short),time.monotonic())
 
 
 
 
-    async def start_trade(self):
+    async def start_background(self, standalone: bool = True):
+        """
+        Start the per-user loops. Under TradingEngine (standalone=False) no loop is
+        started: run state and settings are driven by the engine, and hedge_step /
+        positions_step are scheduled by it like trade_step.
+        """
+        if self.use_private_stream:
+            self.private_stream=PrivateStream(self,testnet=self.testnet)
+            await self.private_stream.start()
+
+        if not standalone:
+            return
+
         tasks = [
             self.check_running(),
             self.check_settings(),
             self.check_hedge(),
             self.check_positions()
         ]
-
         for task in tasks:
             self.all_task.append(asyncio.create_task(task))
 
 
-        df_info=pd.DataFrame.from_dict(await self.redis_client.get_all_coins_info(),orient='index')
+    async def get_candidates(self, coins_info: Dict) -> List[Candidate]:
+        return build_candidates(await self.redis_client.get_coins(),coins_info)
 
-        try:
-            while self.is_running!=Run.OFF:
-                while self.is_running==Run.ACTIVE:
-                    await switch_position_mode(self.client)
 
-                    if not (await self.have_balance()) or len(self.hp_manager.positions)>80:
-                        await asyncio.sleep(120)
-                        logger.warning("Haven't Balance or orders>80")
-                        continue
+    async def trade_step(self, coins: List[Candidate]) -> float:
+        """
+        One entry pass over the candidate coins. Returns seconds until the next pass.
+        A pass with nothing to admit makes no REST calls.
+        """
+        now=time.monotonic()
+        signals={coin.symbol: (coin.long,coin.short) for coin in coins}
+        # Rejections are forgotten when the coin's signal changes or after the cooldown
+        self.rejected={symbol: (signal,at) for symbol,(signal,at) in self.rejected.items()
+                       if signals.get(symbol)==signal and now-at<ENTRY_RETRY_COOLDOWN}
 
-                    coins=pd.DataFrame.from_dict(await self.redis_client.get_coins(),orient='index')
-                    coins = pd.concat([coins,df_info],axis=1,join='inner')
-                    coins=coins[coins[['Long','Short']].any(axis=1)]
-                    logger.debug(f'Coins found {len(coins)}')
-                    for _,coin in coins.iterrows():
-                        if coin.name in self.hp_manager.positions.keys():
-                            continue
+        fresh=[coin for coin in coins
+               if coin.symbol not in self.hp_manager.positions
+               and coin.symbol not in self.entering
+               and coin.symbol not in self.rejected]
 
-                        await asyncio.sleep(np.random.choice(np.linspace(1,3,10)))
-                        task=asyncio.create_task(self.fetch_coin(coin))
+        # Admit only what the order endpoint can take right now, the rest waits for the next pass
+        budget=self.client.rate_limiter.available(self.api_key,ORDER_ENDPOINT)
+        slots=MAX_POSITIONS-len(self.hp_manager.positions)-len(self.entering)
+        admitted=fresh[:max(min(budget,slots),0)]
+        if not admitted:
+            return ENTRY_INTERVAL
 
-                    await asyncio.sleep(10)
+        if now-self.mode_checked_at>POSITION_MODE_INTERVAL:
+            await switch_position_mode(self.client)
+            self.mode_checked_at=now
+
+        # One balance read per pass, shared by every entry of the pass
+        balance=await get_balance(self.client)
+        if not (await self.have_balance(balance)):
+            logger.warning("Haven't Balance")
+            return 120
+        logger.debug(f'Coins found {len(coins)}, admitted {len(admitted)}')
+
+        for coin in admitted:
+            self.entering.add(coin.symbol)
+            task=asyncio.create_task(self.fetch_coin(coin,balance))
+            self.entry_tasks.add(task)
+            task.add_done_callback(self.entry_tasks.discard)
+
+        return ENTRY_INTERVAL
+
+
+    async def start_trade(self):
+        await self.start_background()
+
+        coins_info=await self.redis_client.get_all_coins_info()
+
+        try:
+            while self.is_running!=Run.OFF:
+                while self.is_running==Run.ACTIVE:
+                    coins=await self.get_candidates(coins_info)
+                    await asyncio.sleep(await self.trade_step(coins))
 
                 await asyncio.sleep(1)
 
             await asyncio.sleep(5)
         finally:
-            for task in self.all_task:
-                try:
-                    task.cancel()
-                    await asyncio.wait_for(task, timeout=20)
+            await self.shutdown()
 
-                except asyncio.TimeoutError as er:
-                    logger.error((f"{task.get_name()} took too long to cancel. {er}"))
-                except asyncio.CancelledError as er:
-                    logger.error((f"{task.get_name()} Cancelled. {er}"))
 
+    async def shutdown(self):
+        for task in list(self.entry_tasks):
+            task.cancel()
+        for task in self.all_task:
             try:
-                await self.client.close()
+                task.cancel()
+                await asyncio.wait_for(task, timeout=20)
+
+            except asyncio.TimeoutError as er:
+                logger.error((f"{task.get_name()} took too long to cancel. {er}"))
+            except asyncio.CancelledError as er:
+                logger.error((f"{task.get_name()} Cancelled. {er}"))
+        self.all_task.clear()
+
+        try:
+            await self.hp_manager.close()
+        except Exception as e:
+            logger.error(f'Cannot flush positions {e}')
+
+        if self.private_stream:
+            try:
+                await self.private_stream.stop()
             except Exception as e:
-                logger.error(f'Cannot close session client {e}')
+                logger.error(f'Cannot close private stream {e}')
+
+        try:
+            await self.client.close()
+        except Exception as e:
+            logger.error(f'Cannot close session client {e}')
 
 
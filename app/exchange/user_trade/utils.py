@@ -1,5 +1,5 @@
+import asyncio
 import logging
-from decimal import Decimal
 from typing import Union, Dict,Hashable,List
 
 
@@ -13,10 +13,6 @@ async def send_notification(user_id:int, order:Dict,coin:Hashable):
     except Exception as e:
         logger.error(e)
 
-def round_step_size(quantity: Union[float, Decimal], step_size: Union[float, Decimal]) -> float:
-    quantity = Decimal(str(quantity))
-    return float(quantity - quantity % Decimal(str(step_size)))
-
 def proof_result(data: Union[Dict,List], type_data) -> bool:
     return (isinstance(data,type_data) and len(data)>0)
 
@@ -27,3 +23,12 @@ def safe_float(value):
         return float(value)
     except (ValueError, TypeError):
         return 0.0
+
+
+async def wait_event(event: asyncio.Event, timeout: float) -> bool:
+    """Wait for the event at most timeout seconds, True if it was set."""
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
@@ -1,20 +1,35 @@
+import time
 import logging
 import asyncio
-import json
+from collections import defaultdict
+from types import MappingProxyType
 from uuid import uuid4
 import aiohttp
 
 
+from app.exchange.codec import loads, dumps
+
 from .utils import *
+from .orderbook import OrderBook, SequenceGapError
 
 
 logger=logging.getLogger('websocket')
 
+PUBLIC_LINEAR_URL = "wss://{SUBDOMAIN}.{DOMAIN}.{TLD}/v5/public/linear"
+PRIVATE_URL = "wss://{SUBDOMAIN}.{DOMAIN}.{TLD}/v5/private"
+
 SUBDOMAIN_TESTNET = "stream-testnet"
 SUBDOMAIN_MAINNET = "stream"
 DOMAIN_MAIN = "bybit"
 TLD_MAIN = "com"
 
+# How orderbook/tickers state is handed to callbacks
+SNAPSHOT_COPY = "copy"
+SNAPSHOT_VIEW = "view"
+
+# Resubscribe again when the snapshot asked for after a gap has not come by then
+RESYNC_TIMEOUT = 5
+
 
 
 class AsyncWebSocketManager:
@@ -25,23 +40,42 @@ class AsyncWebSocketManager:
             api_key=None,
             api_secret=None,
             ping_interval=20,
+            snapshot_mode=SNAPSHOT_COPY,
+            dispatcher=None,
     ):
+        if snapshot_mode not in (SNAPSHOT_COPY, SNAPSHOT_VIEW):
+            raise ValueError(f"Unknown snapshot_mode: {snapshot_mode}")
+
         self.testnet = testnet
         self.api_key = api_key
         self.api_secret = api_secret
         self.callback = callback_function
         self.ping_interval = ping_interval
+        self.snapshot_mode = snapshot_mode
+        # CallbackDispatcher: run topic callbacks off the message loop.
+        # Can be shared by pooled connections, closed by the last one to close
+        self.dispatcher = dispatcher.acquire() if dispatcher is not None else None
         self.ws = None
         self.session = None
         self.ping_task = None
         self.subscriptions = {}
         self.callback_directory = {}
         self.data = {}
+        # Orderbook sequence gaps found / topic resubscribes sent, by topic
+        self.gap_stats = defaultdict(int)
+        self.resync_stats = defaultdict(int)
+        # topic -> time the fresh snapshot was asked for
+        self._resyncing = {}
+        self.base_url = PUBLIC_LINEAR_URL
         self.running = False
         self.is_closing = False
+        # Awaited with the manager before every reconnect attempt
+        self.on_reconnect = None
 
 
-    async def connect(self, base_url="wss://{SUBDOMAIN}.{DOMAIN}.{TLD}/v5/public/linear"):
+    async def connect(self, base_url=None):
+        # Remembered so reconnects go back to the same stream (public or private)
+        self.base_url = base_url = base_url or self.base_url
         subdomain = SUBDOMAIN_TESTNET if self.testnet else SUBDOMAIN_MAINNET
         url = base_url.format(SUBDOMAIN=subdomain, DOMAIN=DOMAIN_MAIN, TLD=TLD_MAIN)
 
@@ -74,15 +108,11 @@ class AsyncWebSocketManager:
             return False
 
     async def subscribe(self, topic, callback, symbol=None):
-        if symbol:
-            if isinstance(symbol, str):
-                symbol = [symbol]
-            topics = [topic.format(symbol=s) for s in symbol]
-        else:
-            topics = [topic]
+        await self.subscribe_topics(expand_topics(topic, symbol), callback)
 
+    async def subscribe_topics(self, topics, callback):
         req_id = str(uuid4())
-        subscription_message = json.dumps({
+        subscription_message = dumps({
             "op": "subscribe",
             "req_id": req_id,
             "args": topics
@@ -100,12 +130,16 @@ class AsyncWebSocketManager:
             for t in topics:
                 self.callback_directory[t] = callback
 
+    @property
+    def topics(self):
+        return list(self.callback_directory)
+
     async def _authenticate(self):
         expires = generate_timestamp() + 1000  # 1 second expiration
         param_str = f"GET/realtime{expires}"
         signature = generate_signature(self.api_secret, param_str)
 
-        auth_message = json.dumps({
+        auth_message = dumps({
             "op": "auth",
             "args": [self.api_key, expires, signature]
         })
@@ -118,7 +152,7 @@ class AsyncWebSocketManager:
             try:
                 await asyncio.sleep(self.ping_interval)
                 if self.ws and not self.ws.closed:
-                    await self.ws.send_str(json.dumps({"op": "ping"}))
+                    await self.ws.send_str(dumps({"op": "ping"}))
             except Exception as e:
                 logger.error(f"Error in ping loop: {e}")
                 if not self.ws or self.ws.closed:
@@ -128,7 +162,7 @@ class AsyncWebSocketManager:
         try:
             async for msg in self.ws:
                 if msg.type == aiohttp.WSMsgType.TEXT:
-                    data = json.loads(msg.data)
+                    data = loads(msg.data)
 
                     if data.get("ret_msg") == "pong" or data.get("op") == "pong":
                         continue
@@ -183,22 +217,34 @@ class AsyncWebSocketManager:
             callback = self.callback_directory[topic]
 
             if "orderbook" in topic:
-                self._process_orderbook_update(message, topic)
-                message_copy = copy.deepcopy(message)
-                message_copy["type"] = "snapshot"
-                message_copy["data"] = self.data.get(topic, {})
-                await self._execute_callback(callback, message_copy)
+                if self._process_orderbook_update(message, topic):
+                    await self._deliver(topic, callback, self._snapshot_message(message, topic))
             elif "tickers" in topic:
                 self._process_ticker_update(message, topic)
-                message_copy = copy.deepcopy(message)
-                message_copy["type"] = "snapshot"
-                message_copy["data"] = self.data.get(topic, {})
-                await self._execute_callback(callback, message_copy)
+                await self._deliver(topic, callback, self._snapshot_message(message, topic))
             else:
-                await self._execute_callback(callback, message)
+                await self._deliver(topic, callback, message)
         else:
             await self._execute_callback(self.callback, message)
 
+    def _snapshot_message(self, message, topic):
+        """
+        Message with the accumulated state of the topic in `data`.
+        'copy' mode hands out a private copy, 'view' mode a read-only view of the live state.
+        """
+        state = self.data.get(topic, {})
+        if self.snapshot_mode == SNAPSHOT_VIEW:
+            data = state.view() if isinstance(state, OrderBook) else MappingProxyType(state)
+        else:
+            data = state.to_dict() if isinstance(state, OrderBook) else dict(state)
+        return {**message, "type": "snapshot", "data": data}
+
+    async def _deliver(self, topic, callback, message):
+        if self.dispatcher is None:
+            await self._execute_callback(callback, message)
+        else:
+            await self.dispatcher.put(topic, callback, message)
+
     async def _execute_callback(self, callback, data):
         try:
             if asyncio.iscoroutinefunction(callback):
@@ -209,40 +255,47 @@ class AsyncWebSocketManager:
             logger.error(f"Error in callback: {e}")
 
     def _process_orderbook_update(self, message, topic):
-        if topic not in self.data:
-            self.data[topic] = {}
+        """
+        Apply the frame to the local book. False when the book is out of sync.
+        """
+        book = self.data.get(topic)
+        if book is None:
+            book = self.data[topic] = OrderBook()
 
         if "snapshot" in message["type"]:
-            self.data[topic] = message["data"]
-            return
-
-        if "delta" in message["type"]:
-            book_sides = {"b": message["data"]["b"], "a": message["data"]["a"]}
-            self.data[topic]["u"] = message["data"]["u"]
-            self.data[topic]["seq"] = message["data"]["seq"]
-
-            for side, entries in book_sides.items():
-                for entry in entries:
-                    # Delete price level
-                    if float(entry[1]) == 0:
-                        if side in self.data[topic]:
-                            self.data[topic][side] = [
-                                level for level in self.data[topic][side]
-                                if level[0] != entry[0]
-                            ]
-                        continue
-
-                    if side not in self.data[topic]:
-                        self.data[topic][side] = []
+            book.apply_snapshot(message["data"])
+            self._resyncing.pop(topic, None)
+        elif "delta" in message["type"]:
+            try:
+                book.apply_delta(message["data"])
+            except SequenceGapError as e:
+                now = time.monotonic()
+                requested = self._resyncing.get(topic)
+                if requested is None:
+                    self.gap_stats[topic] += 1
+                    logger.warning(f"{e}. Requesting fresh snapshot")
+                elif now - requested > RESYNC_TIMEOUT:
+                    logger.warning(f"No snapshot for {topic} in {RESYNC_TIMEOUT}s, resubscribing again")
+                else:
+                    return False
+                self._resyncing[topic] = now
+                asyncio.create_task(self._resync_topic(topic))
+                return False
+        return True
 
-                    levels = self.data[topic][side]
-                    for i, level in enumerate(levels):
-                        if level[0] == entry[0]:
-                            # Update existing level
-                            self.data[topic][side][i] = entry
-                            break
-                    else:
-                        self.data[topic][side].append(entry)
+    async def _resync_topic(self, topic):
+        """
+        Resubscribe a single topic so Bybit sends a fresh snapshot.
+        """
+        if not self.ws or self.ws.closed:
+            return
+        try:
+            for op in ("unsubscribe", "subscribe"):
+                await self.ws.send_str(dumps({"op": op, "req_id": str(uuid4()), "args": [topic]}))
+            self.resync_stats[topic] += 1
+        except Exception as e:
+            logger.error(f"Error resyncing {topic}: {e}")
+            self._resyncing.pop(topic, None)
 
     def _process_ticker_update(self, message, topic):
         if topic not in self.data:
@@ -283,47 +336,55 @@ class AsyncWebSocketManager:
         if self.ping_task:
             self.ping_task.cancel()
 
+        # Books get fresh snapshots from the resubscribe
+        self._resyncing.clear()
+
+        if self.on_reconnect:
+            try:
+                await self.on_reconnect(self)
+            except Exception as e:
+                logger.error(f"Error in reconnect hook: {e}")
+
         await self.connect()
 
     async def unsubscribe(self, topic, symbol=None):
-        if symbol:
-            if isinstance(symbol, str):
-                symbol = [symbol]
-            topics = [topic.format(symbol=s) for s in symbol]
-        else:
-            topics = [topic]
+        return await self.unsubscribe_topics(expand_topics(topic, symbol))
 
+    async def unsubscribe_topics(self, topics):
         req_id = str(uuid4())
-        unsubscription_message = json.dumps({
+        unsubscription_message = dumps({
             "op": "unsubscribe",
             "req_id": req_id,
             "args": topics
         })
 
-        if self.ws and not self.ws.closed:
+        sent = bool(self.ws and not self.ws.closed)
+        if sent:
             await self.ws.send_str(unsubscription_message)
             logger.info(f"Unsubscribed from topics: {topics}")
-
-            for t in topics:
-                if t in self.callback_directory:
-                    del self.callback_directory[t]
-                if t in self.data:
-                    del self.data[t]
-
-
-            subscriptions_to_remove = []
-            for sub_req_id, sub_message in self.subscriptions.items():
-                message_data = json.loads(sub_message)
-                if "args" in message_data and any(arg in message_data["args"] for arg in topics):
-                    subscriptions_to_remove.append(sub_req_id)
-
-            for sub_req_id in subscriptions_to_remove:
+        else:
+            logger.warning("WebSocket not connected. Topics dropped from resubscription only.")
+
+        for t in topics:
+            self.callback_directory.pop(t, None)
+            self.data.pop(t, None)
+            if self.dispatcher is not None:
+                await self.dispatcher.discard(t)
+
+        # Keep the other topics of a multi-topic subscription alive on resubscribe
+        for sub_req_id, sub_message in list(self.subscriptions.items()):
+            message_data = loads(sub_message)
+            args = message_data.get("args", [])
+            remaining = [arg for arg in args if arg not in topics]
+            if len(remaining) == len(args):
+                continue
+            if remaining:
+                message_data["args"] = remaining
+                self.subscriptions[sub_req_id] = dumps(message_data)
+            else:
                 del self.subscriptions[sub_req_id]
 
-            return True
-        else:
-            logger.warning("WebSocket not connected. Cannot unsubscribe.")
-            return False
+        return sent
 
 
     async def close(self):
@@ -353,6 +414,10 @@ class AsyncWebSocketManager:
             except Exception as e:
                 logger.error(f"Error closing session: {e}")
 
+        if self.dispatcher is not None:
+            dispatcher, self.dispatcher = self.dispatcher, None
+            await dispatcher.release()
+
         self.ws = None
         self.session = None
         self.ping_task = None
@@ -361,9 +426,10 @@ class AsyncWebSocketManager:
         return True
 
 
-class AsyncV5WebSocketClient(AsyncWebSocketManager):
-    def __init__(self, testnet=False, api_key=None, api_secret=None):
-        super().__init__(self._default_callback, testnet, api_key, api_secret)
+class V5TopicsMixin:
+    """
+    Bybit v5 public topic helpers on top of subscribe/unsubscribe.
+    """
 
     async def _default_callback(self, message):
         logger.debug(f"Received message: {message}")
@@ -395,3 +461,10 @@ class AsyncV5WebSocketClient(AsyncWebSocketManager):
         topic = f"kline.{interval}.{{symbol}}"
         await self.unsubscribe(topic, symbol)
 
+
+class AsyncV5WebSocketClient(V5TopicsMixin, AsyncWebSocketManager):
+    def __init__(self, testnet=False, api_key=None, api_secret=None, snapshot_mode=SNAPSHOT_COPY, dispatcher=None):
+        super().__init__(
+            self._default_callback, testnet, api_key, api_secret,
+            snapshot_mode=snapshot_mode, dispatcher=dispatcher
+        )
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+
+logger = logging.getLogger('websocket')
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = 'block'              # wait for room, slows down the reader
+    DROP_OLDEST = 'drop_oldest'  # keep the newest `maxsize` messages
+    CONFLATE = 'conflate'        # keep only the latest message
+
+
+@dataclass(slots=True)
+class DispatchStats:
+    delivered: int = 0
+    dropped: int = 0
+    conflated: int = 0
+    errors: int = 0
+
+
+class _TopicChannel:
+    def __init__(self, topic: str, policy: OverflowPolicy, maxsize: int, stats: DispatchStats):
+        self.topic = topic
+        self.policy = policy
+        self.maxsize = maxsize
+        self.stats = stats
+        self.items: Deque[Tuple[Callable, dict]] = deque()
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+        self.task = asyncio.create_task(self._run(), name=f"dispatch:{topic}")
+
+    async def put(self, callback: Callable, message: dict):
+        if self.policy == OverflowPolicy.CONFLATE:
+            self.stats.conflated += len(self.items)
+            self.items.clear()
+        elif self.policy == OverflowPolicy.DROP_OLDEST:
+            while len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.stats.dropped += 1
+        else:
+            while len(self.items) >= self.maxsize:
+                self.not_full.clear()
+                await self.not_full.wait()
+
+        self.items.append((callback, message))
+        self.not_empty.set()
+
+    async def _run(self):
+        while True:
+            if not self.items:
+                self.not_empty.clear()
+                await self.not_empty.wait()
+                continue
+
+            callback, message = self.items.popleft()
+            self.not_full.set()
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(message)
+                else:
+                    callback(message)
+                self.stats.delivered += 1
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Error in callback for {self.topic}: {e}")
+
+    async def close(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+class CallbackDispatcher:
+    """
+    Runs websocket callbacks off the message loop: one bounded queue and one
+    worker task per topic. The overflow policy is picked by topic prefix
+    ('tickers', 'orderbook', 'kline', ...) with `default_policy` as fallback.
+    """
+
+    def __init__(
+            self,
+            maxsize: int = 100,
+            default_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+            policies: Optional[Dict[str, OverflowPolicy]] = None,
+    ):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0")
+
+        self.maxsize = maxsize
+        self.default_policy = OverflowPolicy(default_policy)
+        self.policies = {prefix: OverflowPolicy(policy) for prefix, policy in (policies or {}).items()}
+        self.channels: Dict[str, _TopicChannel] = {}
+        self.stats: Dict[str, DispatchStats] = {}
+        # Managers sharing this dispatcher (pooled connections), see acquire/release
+        self.users = 0
+
+    def policy_for(self, topic: str) -> OverflowPolicy:
+        return self.policies.get(topic.split('.', 1)[0], self.default_policy)
+
+    async def put(self, topic: str, callback: Callable, message: dict):
+        channel = self.channels.get(topic)
+        if channel is None:
+            stats = self.stats.setdefault(topic, DispatchStats())
+            channel = self.channels[topic] = _TopicChannel(topic, self.policy_for(topic), self.maxsize, stats)
+        await channel.put(callback, message)
+
+    async def discard(self, topic: str):
+        channel = self.channels.pop(topic, None)
+        if channel is not None:
+            await channel.close()
+
+    def totals(self) -> DispatchStats:
+        total = DispatchStats()
+        for stats in self.stats.values():
+            total.delivered += stats.delivered
+            total.dropped += stats.dropped
+            total.conflated += stats.conflated
+            total.errors += stats.errors
+        return total
+
+    def acquire(self) -> 'CallbackDispatcher':
+        self.users += 1
+        return self
+
+    async def release(self):
+        """Drop one user, the last one closes the channels."""
+        self.users = max(self.users - 1, 0)
+        if not self.users:
+            await self.close()
+
+    async def close(self):
+        channels, self.channels = self.channels, {}
+        for channel in channels.values():
+            await channel.close()
@@ -0,0 +1,245 @@
+from heapq import heapify, heappop, heappush
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+Level = Tuple[str, str]
+
+
+class SequenceGapError(Exception):
+    """Delta does not continue the local book, a fresh snapshot is needed."""
+    def __init__(self, symbol, expected_u, got_u, seq=None):
+        self.symbol = symbol
+        self.expected_u = expected_u
+        self.got_u = got_u
+        self.seq = seq
+        super().__init__(f"Orderbook gap {symbol}: expected u={expected_u}, got u={got_u} seq={seq}")
+
+
+class BookSide:
+    """
+    One side of the book: price -> level map, a heap for the best price and a
+    sorted price list built lazily for depth reads.
+
+    A level update is a dict write plus, for a new price, a heap push: O(log n).
+    Removed prices stay in the heap until they reach its top (lazy deletion).
+    The sorted list is rebuilt only on the first depth read after the set of
+    prices changed, size-only updates keep it.
+    """
+    __slots__ = ('descending', 'levels', '_heap', '_sorted')
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self.levels: Dict[float, Level] = {}
+        self._heap: List[float] = []
+        self._sorted: Optional[List[float]] = []
+
+    def clear(self):
+        self.levels.clear()
+        self._heap.clear()
+        self._sorted = []
+
+    def load(self, entries):
+        self.levels = {float(price): (price, size) for price, size in entries if float(size) != 0}
+        self._rebuild_heap()
+        self._sorted = None
+
+    def _rebuild_heap(self):
+        # bids are kept negated, so the heap top is the best price on both sides
+        self._heap = [-p for p in self.levels] if self.descending else list(self.levels)
+        heapify(self._heap)
+
+    def update(self, price: str, size: str):
+        key = float(price)
+        if float(size) == 0:
+            if self.levels.pop(key, None) is not None:
+                self._sorted = None
+            return
+
+        if key not in self.levels:
+            heappush(self._heap, -key if self.descending else key)
+            self._sorted = None
+            if len(self._heap) > 2 * len(self.levels) + 64:
+                # Too many removed prices left in the heap
+                self.levels[key] = (price, size)
+                self._rebuild_heap()
+                return
+        self.levels[key] = (price, size)
+
+    def best(self) -> Optional[Level]:
+        heap, levels = self._heap, self.levels
+        while heap:
+            key = -heap[0] if self.descending else heap[0]
+            level = levels.get(key)
+            if level is not None:
+                return level
+            heappop(heap)
+        return None
+
+    @property
+    def prices(self) -> List[float]:
+        """Prices ascending, sorted again only after the set of prices changed."""
+        if self._sorted is None:
+            self._sorted = sorted(self.levels)
+        return self._sorted
+
+    def top(self, n: int) -> List[Level]:
+        prices = self.prices[:-n - 1:-1] if self.descending else self.prices[:n]
+        return [self.levels[p] for p in prices]
+
+    def depth_at(self, price: float) -> float:
+        level = self.levels.get(float(price))
+        return float(level[1]) if level else 0.0
+
+    def __iter__(self) -> Iterator[Level]:
+        prices = reversed(self.prices) if self.descending else self.prices
+        return (self.levels[p] for p in prices)
+
+    def __len__(self):
+        return len(self.levels)
+
+
+class OrderBook(Mapping):
+    """
+    Local copy of a Bybit v5 orderbook topic.
+
+    Reads like the raw `data` dict of the topic ({'s', 'b', 'a', 'u', 'seq'}),
+    with levels ordered best first on both sides.
+    """
+    KEYS = ('s', 'b', 'a', 'u', 'seq')
+
+    def __init__(self):
+        self.symbol: Optional[str] = None
+        self.u: Optional[int] = None
+        self.seq: Optional[int] = None
+        self.version = 0
+        # False until a snapshot arrives and after a detected gap
+        self.synced = False
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self._view = OrderBookView(self)
+
+    def apply_snapshot(self, data: Dict):
+        self.symbol = data.get('s', self.symbol)
+        self.u = data.get('u')
+        self.seq = data.get('seq')
+        self.bids.load(data.get('b', []))
+        self.asks.load(data.get('a', []))
+        self.synced = True
+        self.version += 1
+
+    def apply_delta(self, data: Dict):
+        self.check_sequence(data)
+        self.u = data.get('u', self.u)
+        self.seq = data.get('seq', self.seq)
+        for price, size in data.get('b', []):
+            self.bids.update(price, size)
+        for price, size in data.get('a', []):
+            self.asks.update(price, size)
+        self.version += 1
+
+    def check_sequence(self, data: Dict):
+        """
+        Deltas must carry u = previous u + 1 and a non-decreasing seq.
+        """
+        u, seq = data.get('u'), data.get('seq')
+        expected = self.u + 1 if self.u is not None else None
+        gap = (
+            not self.synced
+            or (u is not None and u != expected)
+            or (seq is not None and self.seq is not None and seq < self.seq)
+        )
+        if gap:
+            self.synced = False
+            raise SequenceGapError(self.symbol, expected, u, seq)
+
+    def view(self) -> 'OrderBookView':
+        return self._view
+
+    def best_bid(self) -> Optional[Level]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Level]:
+        return self.asks.best()
+
+    def top(self, side: str, n: int) -> List[Level]:
+        return self._side(side).top(n)
+
+    def depth_at(self, side: str, price: float) -> float:
+        return self._side(side).depth_at(price)
+
+    def _side(self, side: str) -> BookSide:
+        if side in ('b', 'Buy', 'bid', 'bids'):
+            return self.bids
+        if side in ('a', 'Sell', 'ask', 'asks'):
+            return self.asks
+        raise ValueError(f"Unknown orderbook side: {side}")
+
+    def __getitem__(self, key):
+        if key == 's':
+            return self.symbol
+        if key == 'b':
+            return [list(level) for level in self.bids]
+        if key == 'a':
+            return [list(level) for level in self.asks]
+        if key == 'u':
+            return self.u
+        if key == 'seq':
+            return self.seq
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self.KEYS}
+
+
+class OrderBookView(Mapping):
+    """
+    Read-only window on a live OrderBook, nothing is copied until a side is read.
+    Compare `version` between calls to know whether the book has moved.
+    """
+    __slots__ = ('_book',)
+
+    def __init__(self, book: OrderBook):
+        self._book = book
+
+    @property
+    def version(self) -> int:
+        return self._book.version
+
+    @property
+    def symbol(self) -> Optional[str]:
+        return self._book.symbol
+
+    @property
+    def synced(self) -> bool:
+        return self._book.synced
+
+    def best_bid(self) -> Optional[Level]:
+        return self._book.best_bid()
+
+    def best_ask(self) -> Optional[Level]:
+        return self._book.best_ask()
+
+    def top(self, side: str, n: int) -> List[Level]:
+        return self._book.top(side, n)
+
+    def depth_at(self, side: str, price: float) -> float:
+        return self._book.depth_at(side, price)
+
+    def __getitem__(self, key):
+        return self._book[key]
+
+    def __iter__(self):
+        return iter(self._book)
+
+    def __len__(self):
+        return len(self._book)
+
+    def to_dict(self) -> Dict:
+        return self._book.to_dict()
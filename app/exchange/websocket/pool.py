@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from collections import defaultdict
+from math import ceil
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .bybit_websocket import AsyncV5WebSocketClient, V5TopicsMixin
+from .utils import expand_topics
+
+
+logger = logging.getLogger('websocket')
+
+# Bybit accepts several args per subscribe request, keep requests small
+SUBSCRIBE_BATCH = 10
+
+
+class AsyncWebSocketPool(V5TopicsMixin):
+    """
+    Shards topics over several public websocket connections.
+
+    Same subscribe/unsubscribe API as AsyncV5WebSocketClient. Every connection
+    holds at most `topics_per_connection` topics and runs its own message loop,
+    so a burst on one shard does not delay the others. When a connection drops,
+    topics are spread evenly again before it reconnects.
+    """
+
+    def __init__(
+            self,
+            topics_per_connection: int = 100,
+            max_connections: Optional[int] = None,
+            testnet: bool = False,
+            **client_kwargs
+    ):
+        if topics_per_connection <= 0:
+            raise ValueError("topics_per_connection must be greater than 0")
+
+        self.topics_per_connection = topics_per_connection
+        self.max_connections = max_connections
+        self.testnet = testnet
+        self.client_kwargs = client_kwargs
+
+        self.connections: List[AsyncV5WebSocketClient] = []
+        self.topic_owner: Dict[str, AsyncV5WebSocketClient] = {}
+        self.callbacks: Dict[str, Callable] = {}
+        self.connected = False
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> bool:
+        self.connected = True
+        if not self.connections:
+            self._new_connection()
+        results = await asyncio.gather(*(conn.connect() for conn in self.connections))
+        return all(results)
+
+    async def close(self):
+        self.connected = False
+        await asyncio.gather(*(conn.close() for conn in self.connections))
+        self.connections.clear()
+        self.topic_owner.clear()
+        self.callbacks.clear()
+        return True
+
+    async def subscribe(self, topic, callback, symbol=None):
+        async with self._lock:
+            topics = []
+            for t in expand_topics(topic, symbol):
+                if t in self.topic_owner:
+                    self.topic_owner[t].callback_directory[t] = callback
+                    self.callbacks[t] = callback
+                else:
+                    topics.append(t)
+            await self._assign(topics, callback)
+
+    async def unsubscribe(self, topic, symbol=None):
+        async with self._lock:
+            by_connection = defaultdict(list)
+            for t in expand_topics(topic, symbol):
+                conn = self.topic_owner.pop(t, None)
+                self.callbacks.pop(t, None)
+                if conn is not None:
+                    by_connection[conn].append(t)
+
+            for conn, topics in by_connection.items():
+                await conn.unsubscribe_topics(topics)
+            await self._drop_empty_connections()
+        return True
+
+    def topic_counts(self) -> List[int]:
+        return [len(conn.callback_directory) for conn in self.connections]
+
+    def _new_connection(self) -> AsyncV5WebSocketClient:
+        conn = AsyncV5WebSocketClient(testnet=self.testnet, **self.client_kwargs)
+        conn.on_reconnect = self._on_reconnect
+        self.connections.append(conn)
+        return conn
+
+    async def _pick_connection(self, limit: int) -> Tuple[AsyncV5WebSocketClient, bool]:
+        """Least busy connection with room, a new one, or the least busy full one (True)."""
+        free = [conn for conn in self.connections if len(conn.callback_directory) < limit]
+        if free:
+            return min(free, key=lambda conn: len(conn.callback_directory)), False
+
+        if self.max_connections is None or len(self.connections) < self.max_connections:
+            conn = self._new_connection()
+            if self.connected:
+                await conn.connect()
+            return conn, False
+
+        return min(self.connections, key=lambda conn: len(conn.callback_directory)), True
+
+    async def _assign(self, topics: List[str], callback: Callable, limit: Optional[int] = None):
+        limit = limit or self.topics_per_connection
+        pending = list(topics)
+        overloaded = 0
+        while pending:
+            conn, full = await self._pick_connection(limit)
+            room = max(limit - len(conn.callback_directory), 1)
+            chunk, pending = pending[:room], pending[room:]
+            if full:
+                overloaded += len(chunk)
+            for i in range(0, len(chunk), SUBSCRIBE_BATCH):
+                batch = chunk[i:i + SUBSCRIBE_BATCH]
+                await conn.subscribe_topics(batch, callback)
+                for t in batch:
+                    self.topic_owner[t] = conn
+                    self.callbacks[t] = callback
+
+        if overloaded:
+            logger.warning(
+                f"All {len(self.connections)} websocket connections are full, "
+                f"{overloaded} topics put on the least busy ones"
+            )
+
+    async def _drop_empty_connections(self):
+        for conn in list(self.connections):
+            if len(self.connections) > 1 and not conn.callback_directory:
+                self.connections.remove(conn)
+                await conn.close()
+
+    async def _on_reconnect(self, connection: AsyncV5WebSocketClient):
+        async with self._lock:
+            await self.rebalance()
+
+    async def rebalance(self):
+        """
+        Move topics from overfilled connections to the least busy ones.
+        """
+        total = len(self.topic_owner)
+        if not total or not self.connections:
+            return
+
+        target = min(ceil(total / len(self.connections)), self.topics_per_connection)
+        moved = []
+        for conn in self.connections:
+            excess = len(conn.callback_directory) - target
+            if excess > 0:
+                topics = conn.topics[-excess:]
+                await conn.unsubscribe_topics(topics)
+                moved.extend(topics)
+
+        if not moved:
+            return
+
+        by_callback = defaultdict(list)
+        for t in moved:
+            del self.topic_owner[t]
+            by_callback[self.callbacks[t]].append(t)
+
+        for callback, topics in by_callback.items():
+            await self._assign(topics, callback, limit=target)
+
+        logger.info(f"Rebalanced {len(moved)} topics, topics per connection: {self.topic_counts()}")
@@ -15,6 +15,17 @@ def generate_signature(secret, param_str):
 
 
 
+def expand_topics(topic, symbol=None):
+    """
+    Expand a topic template like 'tickers.{symbol}' into concrete topics.
+    """
+    if not symbol:
+        return [topic]
+    if isinstance(symbol, str):
+        symbol = [symbol]
+    return [topic.format(symbol=s) for s in symbol]
+
+
 def generate_uuid():
     return str(uuid.uuid4())
 
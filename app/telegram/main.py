@@ -19,6 +19,8 @@ from app.telegram.handlers import setup_middlewares
 
 
 from app.db.database import r,AsyncSessionLocal,create_tables,drop_tables
+from app.db.services import RedisClient
+from app.exchange.bybit_async import close_sessions
 
 
 
@@ -28,12 +30,15 @@ async def main():
         storage = RedisStorage(r)
         #await drop_tables()
         await create_tables()
+        await RedisClient(r).migrate_is_run()
         dp = Dispatcher(storage=storage)
         setup_routers(dp)
         setup_middlewares(dp)
         await dp.start_polling(bot)
     except Exception as e:
         logging.exception(f"ERROR MAIN \n\n\nALARM\n\n\n {e}")
+    finally:
+        await close_sessions()
 
 
 if __name__ == "__main__":
@@ -34,6 +34,8 @@ async def infinity_get_data_coins(redis: Redis):
                     data = await get_instrument_info(exchange)
                     await redis_client.save_coins_info(data)
                     last_info_update = now
+                    logger.info(f'Redis writes saved: coins {redis_client.coins_writer.stats}, '
+                                f'prices {redis_client.prices_writer.stats}')
 
                 global_coin_settings=(await redis_client.get_all_trade_settings()).to_dict()
                 df = await get_all_tickers(exchange,global_coin_settings)
@@ -0,0 +1,172 @@
+import time
+import logging
+import asyncio
+from typing import Dict, Optional, Set, Tuple, Mapping
+
+
+import ccxt.async_support as ccxt
+from aiogram.fsm.storage.redis import Redis
+
+from app.db.services import RedisClient
+from app.exchange.websocket.bybit_websocket import SNAPSHOT_VIEW
+from app.exchange.websocket.pool import AsyncWebSocketPool
+
+from .utils import get_instrument_info
+
+
+
+logger=logging.getLogger('admin')
+
+
+class TickerState:
+    """
+    Latest markPrice / 24h stats per symbol, fed by the tickers stream.
+    Remembers which symbols moved since the last flush.
+    """
+
+    def __init__(self):
+        self.prices: Dict[str, float] = {}
+        self.stats: Dict[str, Tuple[float, float]] = {}
+        self.signals: Dict[str, Tuple[bool, bool]] = {}
+        self.dirty_prices: Set[str] = set()
+        self.dirty_stats: Set[str] = set()
+        self.thresholds: Dict = {}
+        # Wall time of the last ticker message, the age of every unchanged price
+        self.received_at: Optional[float] = None
+
+    def on_ticker(self, message: Dict):
+        self.received_at = time.time()
+        data: Mapping = message['data']
+        symbol = data.get('symbol')
+        if not symbol:
+            return
+
+        mark_price = data.get('markPrice')
+        if mark_price is not None:
+            mark_price = float(mark_price)
+            if self.prices.get(symbol) != mark_price:
+                self.prices[symbol] = mark_price
+                self.dirty_prices.add(symbol)
+
+        pcnt, turnover = data.get('price24hPcnt'), data.get('turnover24h')
+        if pcnt is not None and turnover is not None:
+            stats = (float(pcnt) * 100, float(turnover))
+            if self.stats.get(symbol) != stats:
+                self.stats[symbol] = stats
+                self.dirty_stats.add(symbol)
+
+    def set_thresholds(self, thresholds: Dict):
+        if thresholds != self.thresholds:
+            self.thresholds = thresholds
+            self.dirty_stats.update(self.stats)
+
+    def _signal(self, symbol: str) -> Tuple[bool, bool]:
+        pcnt, turnover = self.stats[symbol]
+        t = self.thresholds
+        is_long = pcnt >= t.get('long_percentage', 10) and turnover > t.get('volume_long', 30_000_000)
+        is_short = pcnt <= t.get('short_percentage', -10) and turnover > t.get('volume_short', 30_000_000)
+        return is_long, is_short
+
+    def pop_changed_prices(self) -> Dict[str, float]:
+        changed = {symbol: self.prices[symbol] for symbol in self.dirty_prices}
+        self.dirty_prices.clear()
+        return changed
+
+    def pop_changed_coins(self) -> Tuple[Dict[str, Dict], Set[str]]:
+        """
+        Coins whose Long/Short flags changed: (now signalled, no longer signalled).
+        """
+        updated, removed = {}, set()
+        for symbol in self.dirty_stats:
+            signal = self._signal(symbol)
+            if self.signals.get(symbol, (False, False)) == signal:
+                continue
+            self.signals[symbol] = signal
+            if any(signal):
+                updated[symbol] = {'Long': signal[0], 'Short': signal[1]}
+            else:
+                removed.add(symbol)
+        self.dirty_stats.clear()
+        return updated, removed
+
+    def coins(self) -> Dict[str, Dict]:
+        """Every signalled coin, in the format of RedisClient.save_coins."""
+        return {
+            symbol: {'Long': signal[0], 'Short': signal[1]}
+            for symbol, signal in self.signals.items() if any(signal)
+        }
+
+    def drop(self, symbols: Set[str]) -> Set[str]:
+        """
+        Forget delisted symbols, returns the ones that were signalled.
+        """
+        removed = set()
+        for symbol in symbols:
+            self.prices.pop(symbol, None)
+            self.stats.pop(symbol, None)
+            self.dirty_prices.discard(symbol)
+            self.dirty_stats.discard(symbol)
+            if any(self.signals.pop(symbol, (False, False))):
+                removed.add(symbol)
+        return removed
+
+
+async def stream_get_data_coins(redis: Redis, testnet: bool = False, flush_interval: float = 0.5):
+    """
+    Websocket counterpart of infinity_get_data_coins: tickers of every USDT
+    linear symbol are streamed, only changed prices / signals are written.
+    """
+    exchange = ccxt.bybit({
+        'enableRateLimit': False,
+    })
+    redis_client=RedisClient(redis)
+    state = TickerState()
+    ws = AsyncWebSocketPool(topics_per_connection=100, testnet=testnet, snapshot_mode=SNAPSHOT_VIEW)
+
+    symbols: Set[str] = set()
+    last_info_update = 0
+    # The first write replaces the whole hash: coins left by a previous run
+    # or by infinity_parser are not in `removed` of any delta
+    coins_written = False
+
+    try:
+        await ws.connect()
+        while True:
+            try:
+                now = time.time()
+
+                # Обновление instrument_info и списка подписок раз в час
+                if now - last_info_update > 3600:
+                    data = await get_instrument_info(exchange)
+                    await redis_client.save_coins_info(data)
+                    new_symbols = set(data)
+                    if new_symbols - symbols:
+                        await ws.subscribe_tickers(sorted(new_symbols - symbols), callback=state.on_ticker)
+                    if symbols - new_symbols:
+                        await ws.unsubscribe_tickers(sorted(symbols - new_symbols))
+                        await redis_client.update_coins({}, state.drop(symbols - new_symbols))
+                    symbols = new_symbols
+                    last_info_update = now
+                    logger.info(f'Redis writes saved: coins {redis_client.coins_writer.stats}, '
+                                f'prices {redis_client.prices_writer.stats}')
+
+                state.set_thresholds((await redis_client.get_all_trade_settings()).to_dict())
+
+                prices = state.pop_changed_prices()
+                if state.received_at is not None:
+                    await redis_client.save_mark_price_coins(prices, published_at=state.received_at)
+
+                updated, removed = state.pop_changed_coins()
+                if not coins_written:
+                    await redis_client.save_coins(state.coins())
+                    coins_written = True
+                elif updated or removed:
+                    await redis_client.update_coins(updated, removed)
+
+                await asyncio.sleep(flush_interval)
+            except Exception as e:
+                logger.error(e)
+                await asyncio.sleep(5)
+    finally:
+        await ws.close()
+        await exchange.close()
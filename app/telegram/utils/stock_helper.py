@@ -2,10 +2,10 @@ import asyncio
 from datetime import datetime
 from typing import Dict,List
 import pandas as pd
-import random
+import logging
 
 from app.db.models import User
-from app.exchange.bybit_async import BybitRequester,get_pnl_from_chunks,get_all_position,get_api_permissions,close_order
+from app.exchange.bybit_async import BybitRequester,get_pnl_from_chunks,get_all_position,get_api_permissions,close_batch_orders
 from app.telegram.utils.datetime_helper import get_month_bounds,split_into_weeks,filter_months
 
 testnet=True
@@ -14,9 +14,10 @@ testnet=True
 async def close_all_order_user(user:User):
     client:BybitRequester =BybitRequester(user.api, user.secret, True)
     positions = await get_all_position(client)
-    for position in positions:
-        await close_order(client,position)
-        await asyncio.sleep(random.random())
+    results = await close_batch_orders(client,positions)
+    failed = [result for result in results if result['retCode'] != 0]
+    if failed:
+        logging.error(f'User {user.id} failed to close: {failed}')
     return positions
 
 
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+from bisect import bisect
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from redis.asyncio import Redis
+
+from app.db.models import Run
+from app.db.services import RedisClient
+
+logger=logging.getLogger('trading')
+
+
+def node_names(worker_count: int, processes: int) -> List[str]:
+    """Every shard of the deployment, the same list in every process."""
+    return [f'{worker}:{process}' for worker in range(worker_count) for process in range(processes)]
+
+
+class HashRing:
+    """
+    Consistent hashing of user ids over worker nodes. Adding or removing a node
+    moves only ~1/N of the users, the rest stay where their bots already run.
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 100):
+        self.replicas = replicas
+        self._ring: Dict[int, str] = {}
+        self._keys: List[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        # hash() is salted per process, md5 gives the same ring everywhere
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+    def add(self, node: str):
+        for i in range(self.replicas):
+            self._ring[self._hash(f'{node}#{i}')] = node
+        self._keys = sorted(self._ring)
+
+    def remove(self, node: str):
+        for i in range(self.replicas):
+            self._ring.pop(self._hash(f'{node}#{i}'), None)
+        self._keys = sorted(self._ring)
+
+    def node_for(self, user_id: int) -> str:
+        if not self._keys:
+            raise ValueError('Hash ring is empty')
+        index = bisect(self._keys, self._hash(str(user_id))) % len(self._keys)
+        return self._ring[self._keys[index]]
+
+
+@dataclass(slots=True)
+class Command:
+    id: str
+    user_id: int
+    state: Run
+
+
+class CommandBroker:
+    """
+    Reads run state commands written by RedisClient.set_is_run to the
+    `trade_commands` stream. Every worker reads the whole stream and keeps
+    the commands of its own shard.
+    """
+
+    def __init__(self, redis: Redis, ring: HashRing, node: str, block_ms: int = 5000, count: int = 100):
+        self.redis = redis
+        self.ring = ring
+        self.node = node
+        self.block_ms = block_ms
+        self.count = count
+        self.last_id = '$'
+
+    def owns(self, user_id: int) -> bool:
+        return self.ring.node_for(user_id) == self.node
+
+    async def mark(self):
+        """Remember the stream position, commands after it are read by listen()."""
+        last = await self.redis.xrevrange(RedisClient.COMMANDS_STREAM, count=1)
+        self.last_id = last[0][0] if last else '0-0'
+
+    @staticmethod
+    def _parse(entry_id: str, fields: Dict[str, str]) -> Optional[Command]:
+        try:
+            return Command(entry_id, int(fields['user_id']), Run(fields['state']))
+        except (KeyError, ValueError):
+            logger.warning(f'Bad command {entry_id}: {fields}')
+            return None
+
+    async def listen(self) -> AsyncIterator[Command]:
+        while True:
+            response = await self.redis.xread(
+                {RedisClient.COMMANDS_STREAM: self.last_id}, count=self.count, block=self.block_ms
+            )
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    self.last_id = entry_id
+                    command = self._parse(entry_id, fields)
+                    if command and self.owns(command.user_id):
+                        yield command
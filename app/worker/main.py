@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import multiprocessing as mp
+from typing import Dict, List, Optional
+
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+from app.common.config import settings
+from app.common import loggers
+
+from app.db.database import r, AsyncSessionLocal
+from app.db.models import Run
+from app.db.services import postgres_db as pdb, RedisClient, change_listener
+from app.exchange.bybit_async import close_sessions
+from app.exchange.user_trade.engine import TradingEngine
+from app.worker.broker import HashRing, CommandBroker, node_names
+
+logger=logging.getLogger('trading')
+
+SYNC_INTERVAL = 60  # full is_run scan, only a safety net for missed commands
+
+
+class Worker:
+    """One shard: runs the TradeBots of the users the hash ring gives to `node`."""
+
+    def __init__(self, node: str, nodes: List[str]):
+        self.node = node
+        self.redis_client = RedisClient(r)
+        self.broker = CommandBroker(r, HashRing(nodes), node)
+        self.engine = TradingEngine(
+            r, self.redis_client,
+            max_concurrent_steps=settings.WORKER_MAX_STEPS,
+            testnet=settings.TESTNET,
+        )
+
+    async def load_user_data(self, user_id: int) -> Optional[Dict]:
+        async with AsyncSessionLocal() as db:
+            user = await pdb.get_user(db, user_id)
+        if not user or user.is_banned or not user.api or not user.secret:
+            return None
+        return {'api_key': user.api, 'api_secret': user.secret}
+
+    async def apply(self, user_id: int, state: Run):
+        try:
+            if state == Run.OFF:
+                await self.engine.stop_user(user_id)
+            elif user_id in self.engine.users:
+                self.engine.set_state(user_id, state)
+            else:
+                user_data = await self.load_user_data(user_id)
+                if user_data is None:
+                    logger.warning(f'Worker {self.node}: user {user_id} has no api keys, not started')
+                    return
+                await self.engine.start_user(user_id, user_data, state)
+        except Exception as e:
+            logger.exception(f'Worker {self.node}: cannot apply {state.value} to user {user_id} {e}')
+
+    async def sync(self):
+        states = await self.redis_client.get_all_is_run()
+        for user_id, state in states.items():
+            if self.broker.owns(user_id) and self.engine.state_of(user_id) != state:
+                await self.apply(user_id, state)
+        for user_id in list(self.engine.users):
+            if user_id not in states:
+                await self.apply(user_id, Run.OFF)
+
+    async def consume(self):
+        async for command in self.broker.listen():
+            logger.info(f'Worker {self.node}: user {command.user_id} -> {command.state.value}')
+            await self.apply(command.user_id, command.state)
+
+    async def periodic_sync(self):
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.exception(e)
+
+    async def run(self):
+        await self.redis_client.migrate_is_run()
+        # Position first, then state: a command sent during the scan is read again, not lost
+        await self.broker.mark()
+        await self.sync()
+        logger.info(f'Worker {self.node}: started with {len(self.engine.users)} users')
+
+        tasks = [
+            asyncio.create_task(self.engine.run()),
+            asyncio.create_task(self.consume()),
+            asyncio.create_task(self.periodic_sync()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.engine.close()
+            await change_listener(r).close()
+            await close_sessions()
+            await r.aclose()
+
+
+async def run_worker(node: str, nodes: List[str]):
+    task = asyncio.create_task(Worker(node, nodes).run())
+    if sys.platform != 'win32':
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info(f'Worker {node}: stopped')
+
+
+def run_process(node: str, nodes: List[str]):
+    asyncio.run(run_worker(node, nodes))
+
+
+def shard_processes() -> int:
+    """
+    Processes per container. It sizes the hash ring too, so with several
+    containers it must come from the shared settings, not from local cores.
+    """
+    if settings.WORKER_PROCESSES:
+        return settings.WORKER_PROCESSES
+    if settings.WORKER_COUNT > 1:
+        raise SystemExit(
+            'WORKER_PROCESSES must be set when WORKER_COUNT > 1: '
+            'every container has to build the same hash ring'
+        )
+    return os.cpu_count() or 1
+
+
+def main():
+    nodes = node_names(settings.WORKER_COUNT, shard_processes())
+    local = [node for node in nodes if node.split(':')[0] == str(settings.WORKER_INDEX)]
+    logger.info(f'Worker {settings.WORKER_INDEX}: {len(local)} processes of {len(nodes)} shards')
+
+    if len(local) == 1:
+        run_process(local[0], nodes)
+        return
+
+    # spawn: children must not inherit the parent's redis/db connections
+    ctx = mp.get_context('spawn')
+    children: Dict[str, mp.Process] = {}
+
+    def stop(*_):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while True:
+            for node in local:
+                child = children.get(node)
+                if child is None or not child.is_alive():
+                    if child is not None:
+                        logger.error(f'Worker {node} exited with {child.exitcode}, restarting')
+                    children[node] = ctx.Process(target=run_process, args=(node, nodes), name=f'worker-{node}')
+                    children[node].start()
+            time.sleep(5)
+    finally:
+        for child in children.values():
+            child.terminate()
+        for child in children.values():
+            child.join(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
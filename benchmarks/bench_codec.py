@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of the JSON backends in app.exchange.codec on Bybit frames.
+
+    python benchmarks/bench_codec.py [--number 20000]
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.exchange.codec import available_codecs
+
+
+TICKER_FRAME = (
+    '{"topic":"tickers.BTCUSDT","type":"snapshot","data":{"symbol":"BTCUSDT","tickDirection":"PlusTick",'
+    '"price24hPcnt":"0.017103","lastPrice":"17216.00","prevPrice24h":"16926.50","highPrice24h":"17281.50",'
+    '"lowPrice24h":"16915.00","prevPrice1h":"17238.00","markPrice":"17217.33","indexPrice":"17227.36",'
+    '"openInterest":"68744.761","openInterestValue":"1183601235.91","turnover24h":"1570383121.943499",'
+    '"volume24h":"91705.276","nextFundingTime":"1673280000000","fundingRate":"-0.000212","bid1Price":"17215.50",'
+    '"bid1Size":"84.489","ask1Price":"17216.00","ask1Size":"83.020"},"cs":24987956059,"ts":1673272861686}'
+)
+
+TICKER_DELTA_FRAME = (
+    '{"topic":"tickers.BTCUSDT","type":"delta","data":{"symbol":"BTCUSDT","markPrice":"17217.40",'
+    '"indexPrice":"17227.41","bid1Price":"17215.50","bid1Size":"84.102"},"cs":24987956061,"ts":1673272861786}'
+)
+
+
+def orderbook_frame(depth: int = 50) -> str:
+    rnd = random.Random(7)
+    bids = ','.join(f'["{17215.5 - i * 0.5:.2f}","{rnd.uniform(0.001, 50):.3f}"]' for i in range(depth))
+    asks = ','.join(f'["{17216.0 + i * 0.5:.2f}","{rnd.uniform(0.001, 50):.3f}"]' for i in range(depth))
+    return (
+        f'{{"topic":"orderbook.{depth}.BTCUSDT","type":"snapshot","ts":1672304484978,'
+        f'"data":{{"s":"BTCUSDT","b":[{bids}],"a":[{asks}],"u":18521288,"seq":7961638724}},'
+        f'"cts":1672304484976}}'
+    )
+
+
+ORDER_PARAMS = {
+    'category': 'linear', 'symbol': 'BTCUSDT', 'orderType': 'Market', 'side': 'Buy', 'qty': '0.001',
+    'takeProfit': '17700.5', 'stopLoss': None, 'timeInForce': 'GTC', 'positionIdx': 1,
+}
+
+
+def run(number: int):
+    payloads = {
+        'ticker snapshot': TICKER_FRAME,
+        'ticker delta': TICKER_DELTA_FRAME,
+        'orderbook.50': orderbook_frame(50),
+        'orderbook.500': orderbook_frame(500),
+    }
+    codecs = available_codecs()
+    print(f"backends: {', '.join(codecs)}   (us per call, {number} calls)")
+
+    for name, payload in payloads.items():
+        raw = payload.encode()
+        print(f"\n{name} ({len(raw)} bytes)")
+        for codec in codecs.values():
+            decode_str = timeit.timeit(lambda: codec.loads(payload), number=number) / number * 1e6
+            decode_raw = timeit.timeit(lambda: codec.loads(raw), number=number) / number * 1e6
+            print(f"  {codec.name:8} loads(str) {decode_str:8.2f}   loads(bytes) {decode_raw:8.2f}")
+
+    print("\nsigned order body")
+    for codec in codecs.values():
+        encode = timeit.timeit(lambda: codec.dumps(ORDER_PARAMS), number=number) / number * 1e6
+        print(f"  {codec.name:8} dumps {encode:8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20000)
+    run(parser.parse_args().number)
@@ -0,0 +1,76 @@
+"""
+TradeBot.get_delete_positions: the old pandas diff against app.exchange.user_trade.reconcile.
+
+    python benchmarks/bench_reconcile.py [--number 200]
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.exchange.user_trade.reconcile import reconcile
+
+
+def make_positions(count: int, stale_share: float = 0.1):
+    """Tracked legs as HedgePositionManager.all_to_dict() and the matching /v5/position/list records."""
+    rnd = random.Random(count)
+    tracked, api = [], []
+    for i in range(count):
+        symbol = f'COIN{i // 2}USDT'
+        position_idx = 1 + i % 2
+        size = round(rnd.uniform(1, 1000), 3)
+        price = round(rnd.uniform(0.01, 100), 4)
+        tracked.append({'symbol': symbol, 'size': size, 'entry_price': price, 'position_idx': position_idx,
+                        'amount': size * price, 'tpsl_order_id': str(i), 'updated_time': '0', 'is_main': i % 2 == 0})
+
+        roll = rnd.random()
+        if roll < stale_share / 2:
+            continue  # closed on the exchange
+        if roll < stale_share:
+            size += 1  # partially filled / averaged
+        api.append({'symbol': symbol, 'size': str(size), 'avgPrice': str(price), 'positionIdx': position_idx,
+                    'side': 'Buy' if position_idx == 1 else 'Sell', 'leverage': '10', 'positionValue': '1'})
+    return tracked, api
+
+
+def pandas_delete_positions(result_db, result_api):
+    """The implementation replaced by reconcile()."""
+    positions_db = pd.DataFrame(result_db)[['symbol', 'size', 'entry_price', 'position_idx', 'is_main']]
+    positions_api = pd.DataFrame(result_api)[
+        ['symbol', 'size', 'avgPrice', 'positionIdx', ]].rename(columns={
+        'avgPrice': 'entry_price',
+        'positionIdx': 'position_idx'
+    }).astype({
+        'size': float,
+        'entry_price': float,
+        'position_idx': int
+    })
+    keys = ['symbol', 'size', 'entry_price', 'position_idx', ]
+    keys_from_api = set(tuple(row) for row in positions_api[keys].to_numpy())
+    mask = ~positions_db[keys].apply(tuple, axis=1).isin(keys_from_api)
+    return positions_db[mask].to_dict('records')
+
+
+def run(number: int):
+    print(f"us per call, {number} calls")
+    for count in (10, 100, 1000):
+        tracked, api = make_positions(count)
+
+        old = {(p['symbol'], p['position_idx']) for p in pandas_delete_positions(tracked, api)}
+        new = {(p['symbol'], p['position_idx']) for p in reconcile(tracked, api).stale}
+        assert old == new, 'implementations disagree'
+
+        t_old = timeit.timeit(lambda: pandas_delete_positions(tracked, api), number=number) / number * 1e6
+        t_new = timeit.timeit(lambda: reconcile(tracked, api), number=number) / number * 1e6
+        print(f"  {count:5} positions ({len(new):3} stale)   pandas {t_old:10.1f}   reconcile {t_new:8.1f}   x{t_old / t_new:.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200)
+    run(parser.parse_args().number)
@@ -0,0 +1,95 @@
+"""
+Per-call cost of the TradeBot selection paths: pandas (before) against
+app.exchange.user_trade.records (after).
+
+    python benchmarks/bench_records.py [--number 2000]
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.exchange.user_trade.records import build_candidates, select_orders
+
+
+def make_orders(count: int = 5):
+    rnd = random.Random(count)
+    return [{
+        'orderId': f'order-{i}', 'symbol': 'BTCUSDT', 'side': rnd.choice(['Buy', 'Sell']),
+        'orderStatus': 'Filled', 'stopOrderType': rnd.choice(['', 'TakeProfit', 'StopLoss']),
+        'qty': '0.001', 'price': '17000', 'avgPrice': '17001', 'createType': 'CreateByUser',
+    } for i in range(count)]
+
+
+def make_market(count: int):
+    rnd = random.Random(count)
+    coins, info = {}, {}
+    for i in range(count):
+        symbol = f'COIN{i}USDT'
+        coins[symbol] = {'Long': rnd.random() < 0.05, 'Short': rnd.random() < 0.05}
+        info[symbol] = {'tickSize': 0.0001, 'qtyStep': 0.1, 'minOrderQty': 0.1}
+    return coins, info
+
+
+def pandas_get_order(orders, orderId=None, side=''):
+    df = pd.DataFrame(orders)
+    if orderId:
+        if isinstance(orderId, list):
+            df = df[df['orderId'].isin(orderId)]
+        else:
+            df = df[df['orderId'] == orderId]
+    if side != '':
+        df = df[((df['side'] != side) & (df['stopOrderType'].isin(['TakeProfit', 'StopLoss'])))]
+    order_records = df.to_dict(orient='records')
+    return order_records[0] if order_records else {}
+
+
+def records_get_order(orders, orderId=None, side=''):
+    order_records = select_orders(orders, orderId, side)
+    return order_records[0].raw if order_records else {}
+
+
+def pandas_candidates(coins, coins_info):
+    df_info = pd.DataFrame.from_dict(coins_info, orient='index')
+    df = pd.DataFrame.from_dict(coins, orient='index')
+    df = pd.concat([df, df_info], axis=1, join='inner')
+    df = df[df[['Long', 'Short']].any(axis=1)]
+    return [coin.name for _, coin in df.iterrows()]
+
+
+def records_candidates(coins, coins_info):
+    return [coin.symbol for coin in build_candidates(coins, coins_info)]
+
+
+def bench(name, before, after, number):
+    t_before = timeit.timeit(before, number=number) / number * 1e6
+    t_after = timeit.timeit(after, number=number) / number * 1e6
+    print(f"  {name:32} pandas {t_before:9.1f}   records {t_after:7.1f}   x{t_before / t_after:.0f}")
+
+
+def run(number: int):
+    print(f"us per call, {number} calls")
+    orders = make_orders()
+    for order_id, side in ((orders[2]['orderId'], ''), ([o['orderId'] for o in orders[:3]], ''), (None, 'Buy')):
+        assert pandas_get_order(orders, order_id, side) == records_get_order(orders, order_id, side)
+    bench('get_order by id', lambda: pandas_get_order(orders, orders[2]['orderId']),
+          lambda: records_get_order(orders, orders[2]['orderId']), number)
+    bench('get_order tp/sl by side', lambda: pandas_get_order(orders, side='Buy'),
+          lambda: records_get_order(orders, side='Buy'), number)
+
+    for count in (100, 500):
+        coins, info = make_market(count)
+        assert pandas_candidates(coins, info) == records_candidates(coins, info)
+        bench(f'candidates from {count} coins', lambda: pandas_candidates(coins, info),
+              lambda: records_candidates(coins, info), max(number // 10, 1))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=2000)
+    run(parser.parse_args().number)
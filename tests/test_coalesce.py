@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from app.exchange.bybit_async import BybitRequester
+from app.exchange.bybit_async.coalesce import read_cache
+
+POSITIONS = '/v5/position/list'
+PARAMS = {'category': 'linear', 'settleCoin': 'USDT'}
+
+
+def make_requester(api_key: str):
+    """Requester whose signed requests are answered in-process, GET n returns {'n': n}."""
+    requester = BybitRequester(api_key, 'secret', testnet=True, read_cache_ttl={POSITIONS: 60})
+    requester.calls = []
+    requester.first_get_sent = asyncio.Event()
+    requester.hold_first_get = asyncio.Event()
+
+    async def send(method, endpoint, params, **kwargs):
+        requester.calls.append(method)
+        if method != 'GET':
+            return {'retCode': 0, 'result': {}}
+        n = requester.calls.count('GET')
+        if n == 1:
+            requester.first_get_sent.set()
+            await requester.hold_first_get.wait()
+        return {'retCode': 0, 'result': {'n': n}}
+
+    requester._send_signed_request = send
+    return requester
+
+
+def test_read_in_flight_during_write_is_not_cached():
+    async def scenario():
+        requester = make_requester('key-stale-put')
+        first = asyncio.create_task(requester.send_signed_request('GET', POSITIONS, PARAMS))
+        await requester.first_get_sent.wait()
+
+        await requester.send_signed_request('POST', '/v5/order/create', {'symbol': 'BTCUSDT'})
+        requester.hold_first_get.set()
+        assert (await first)['result']['n'] == 1
+
+        # The first read saw the account before the order, it must not be served from the cache
+        second = await requester.send_signed_request('GET', POSITIONS, PARAMS)
+        assert second['result']['n'] == 2
+        third = await requester.send_signed_request('GET', POSITIONS, PARAMS)
+        assert third['result']['n'] == 2
+        assert requester.calls == ['GET', 'POST', 'GET']
+
+    asyncio.run(scenario())
+
+
+def test_read_after_write_does_not_join_earlier_request():
+    async def scenario():
+        requester = make_requester('key-join')
+        first = asyncio.create_task(requester.send_signed_request('GET', POSITIONS, PARAMS))
+        await requester.first_get_sent.wait()
+
+        await requester.send_signed_request('POST', '/v5/order/create', {'symbol': 'BTCUSDT'})
+        second = await asyncio.wait_for(requester.send_signed_request('GET', POSITIONS, PARAMS), 1)
+        assert second['result']['n'] == 2
+
+        requester.hold_first_get.set()
+        assert (await first)['result']['n'] == 1
+        assert read_cache.get('key-join', (requester._get_base_url(), 'key-join', POSITIONS,
+                                           'category=linear&settleCoin=USDT'), 60)['result']['n'] == 2
+
+    asyncio.run(scenario())